@@ -1,15 +1,46 @@
 import os
+import gc
 import time
+import random
 import joblib
 import logging
+import numpy as np
 import hashlib
+import queue
+import multiprocessing
 import asyncio
 import aiohttp
+import orjson
+from config import settings
+from cache import (
+    LRUCache,
+    SimpleCache,
+    load_prediction_cache,
+    save_prediction_cache,
+)
 from database import db_manager
+from middleware import RequestSizeLimitMiddleware, setup_middleware
+from batcher import PredictionBatcher
+from inference import (
+    Document,
+    FusedLinearScorer,
+    downcast_classifier,
+    downcast_vectorizer,
+    is_linear_classifier,
+    load_classifier_arrays,
+    load_vectorizer_arrays,
+    model_fingerprint,
+    predict_linear,
+    prepare_for_inference,
+)
 from contextlib import asynccontextmanager
-from typing import Optional, List, Dict, Any
+from logging.handlers import QueueHandler, QueueListener
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, Tuple, BinaryIO, Union
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field, field_validator
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel, ConfigDict, Field
 from fastapi import (
     FastAPI,
     HTTPException,
@@ -19,17 +50,72 @@ from fastapi import (
     Form,
     Query,
     Request,
+    Depends,
+    Response,
 )
 
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:  # brotli-asgi is optional; fall back to gzip only
+    BrotliMiddleware = None
+
+try:
+    from redis.asyncio import Redis
+except ImportError:  # redis is optional; VT verdicts then stay per worker
+    Redis = None
+
 
 # -----------------------------
 # Logging Configuration
 # -----------------------------
 logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    level=settings.LOG_LEVEL.upper(),
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
 )
 logger = logging.getLogger("Phishing-Email-Detection-System-API")
 
+
+class DeferredFormatQueueHandler(QueueHandler):
+    """
+    QueueHandler that enqueues records unformatted.
+    The queue never leaves the process, so the record needs no pickling-safe
+    copy; the listener's handlers format message, arguments and tracebacks.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def start_log_listener() -> QueueListener:
+    """
+    Route application log records through a queue drained by a background thread.
+    Both formatting and the handlers' stream I/O run on the listener thread, so
+    a logging call on the event loop only enqueues the record.
+    Started per process, since the thread does not survive a fork.
+    """
+    root = logging.getLogger()
+    handlers = root.handlers[:]
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    for handler in handlers:
+        root.removeHandler(handler)
+    root.addHandler(DeferredFormatQueueHandler(log_queue))
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def stop_log_listener(listener: QueueListener) -> None:
+    """Flush queued records and restore the root logger's handlers."""
+    listener.stop()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        if isinstance(handler, QueueHandler):
+            root.removeHandler(handler)
+    for handler in listener.handlers:
+        root.addHandler(handler)
+
+
 # -----------------------------
 # Configuration
 # -----------------------------
@@ -37,65 +123,343 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODELS_DIR = os.path.join(BASE_DIR, "models")
 MODEL_PATH = os.path.join(MODELS_DIR, "spam_classifier_model.pkl")
 VECTORIZER_PATH = os.path.join(MODELS_DIR, "tfidf_vectorizer.pkl")
+# Array exports produced by convert_models.py (preferred when present)
+MODEL_ARRAYS_DIR = os.path.join(MODELS_DIR, "classifier")
+VECTORIZER_ARRAYS_DIR = os.path.join(MODELS_DIR, "vectorizer")
+# Prediction cache persisted across restarts
+PREDICTION_CACHE_PATH = os.path.join(MODELS_DIR, "prediction_cache.npz")
+
+# Largest page /reports will return when paginated
+MAX_REPORTS_PAGE_SIZE = 1000
+# Paginated listings leave out the email body (served by /report?id=)
+REPORT_LIST_PROJECTION = {"body": 0}
+# Most emails accepted by one /predict/batch request
+MAX_BATCH_EMAILS = 100
 
 # VirusTotal Configuration
 VT_API_KEY = os.getenv("VT_API_KEY")
 VT_BASE = "https://www.virustotal.com/api/v3"
 VT_HEADERS = {"x-apikey": VT_API_KEY} if VT_API_KEY else {}
-ANALYSIS_POLL_INTERVAL = 15  # seconds
+ANALYSIS_POLL_INITIAL = 2  # seconds before the first poll
+ANALYSIS_POLL_MAX = 30  # seconds; cap for the growing poll interval
+ANALYSIS_POLL_BACKOFF = 1.6
+ANALYSIS_POLL_JITTER = 1  # seconds of random spread added to each poll delay
+VT_RATE_LIMIT_RETRIES = 3
 ANALYSIS_TIMEOUT = 180  # seconds
-MAX_VT_CONCURRENCY = 2
+VT_STREAM_THRESHOLD = 1024 * 1024  # Starlette spools uploads above 1 MiB to disk
+VT_REQUEST_TIMEOUT = 120  # seconds per VT request, uploads included
+MAX_VT_CONCURRENCY = 2  # VirusTotal API requests in flight at once
+vt_semaphore = asyncio.Semaphore(MAX_VT_CONCURRENCY)
+
+# VirusTotal verdicts keyed by attachment SHA256, each with its own TTL
+vt_score_cache = SimpleCache(
+    default_ttl=settings.VT_CACHE_TTL, maxsize=settings.VT_CACHE_SIZE
+)
+
+# VirusTotal scans in progress, keyed by attachment SHA256
+vt_scans: Dict[str, asyncio.Task] = {}
+
+# Optional Redis connection sharing VT verdicts between worker processes
+vt_redis: Optional["Redis"] = None
+VT_REDIS_PREFIX = "vt:"
+
+# Shared VirusTotal HTTP session, created on first scan and closed on shutdown
+vt_session: Optional[aiohttp.ClientSession] = None
 
 # Global state to hold models
 ml_models: Dict[str, Any] = {}
 
 
 # -----------------------------
-# Lifespan Context (Startup/Shutdown)
+# Model Loading
 # -----------------------------
-@asynccontextmanager
-async def lifespan(app: FastAPI):
+def load_models() -> Tuple[Any, Any]:
     """
-    Load models on startup and clean up on shutdown.
+    Load the classifier and vectorizer from disk.
+    Prefers the memory-mapped numpy arrays and falls back to the joblib pickles.
     """
-    # Initialize ML Models
+    if os.path.isdir(MODEL_ARRAYS_DIR) and os.path.isdir(VECTORIZER_ARRAYS_DIR):
+        logger.info("Loading array models from %s", MODELS_DIR)
+        classifier = load_classifier_arrays(MODEL_ARRAYS_DIR)
+        vectorizer = load_vectorizer_arrays(VECTORIZER_ARRAYS_DIR)
+    else:
+        logger.info("Model path: %s", MODEL_PATH)
+        logger.info("Vectorizer path: %s", VECTORIZER_PATH)
+        # Uncompressed joblib pickles memory-map their numpy arrays, so worker
+        # processes share coef_/idf_ pages instead of each holding a copy
+        classifier = downcast_classifier(joblib.load(MODEL_PATH, mmap_mode="r"))
+        vectorizer = downcast_vectorizer(joblib.load(VECTORIZER_PATH, mmap_mode="r"))
+
+    prepare_for_inference(classifier, vectorizer)
+    return classifier, vectorizer
+
+
+def model_files_exist() -> bool:
+    """Check if either the array or pickle model files are available."""
+    return (
+        os.path.isdir(MODEL_ARRAYS_DIR) and os.path.isdir(VECTORIZER_ARRAYS_DIR)
+    ) or (os.path.exists(MODEL_PATH) and os.path.exists(VECTORIZER_PATH))
+
+
+def init_models() -> None:
+    """Load the models into ml_models and build the fused scorer when supported."""
     logger.info("Loading ML models...")
-    logger.info(f"Model path: {MODEL_PATH}")
-    logger.info(f"Vectorizer path: {VECTORIZER_PATH}")
     try:
-        if not os.path.exists(MODEL_PATH) or not os.path.exists(VECTORIZER_PATH):
+        if not model_files_exist():
             logger.warning(
-                f"Model files not found in {MODELS_DIR}. Predictions will fail."
+                "Model files not found in %s. Predictions will fail.", MODELS_DIR
             )
             ml_models["error"] = "Model files missing"
             ml_models["ready"] = False
         else:
-            classifier = joblib.load(MODEL_PATH)
-            vectorizer = joblib.load(VECTORIZER_PATH)
-            logger.info(f"Classifier loaded: {classifier}")
-            logger.info(f"Vectorizer loaded: {vectorizer}")
+            classifier, vectorizer = load_models()
+            logger.info("Classifier loaded: %s", classifier)
+            logger.info("Vectorizer loaded: %s", vectorizer)
             ml_models["classifier"] = classifier
             ml_models["vectorizer"] = vectorizer
+
+            # Fuse vectorizer and linear classifier into a single scoring step
+            if FusedLinearScorer.supports(vectorizer, classifier):
+                ml_models["scorer"] = FusedLinearScorer(vectorizer, classifier)
+                logger.info("Using fused TF-IDF/linear scorer for predictions")
+
+            ml_models["fingerprint"] = model_fingerprint(classifier, vectorizer)
             ml_models["ready"] = True
             logger.info("Models loaded successfully!")
     except Exception as e:
-        logger.error(f"Failed to load models: {e}")
+        logger.error("Failed to load models: %s", e)
         ml_models["error"] = str(e)
         ml_models["ready"] = False
 
-    # Connect to Database
+
+# -----------------------------
+# Batched Inference
+# -----------------------------
+def predict_batch(documents: List[Document]) -> List[Tuple[Any, Optional[Any]]]:
+    """
+    Vectorize and classify a batch of documents with a single transform/predict call.
+    A document is a text or a tuple of text parts (subject, body) scored as if
+    joined by a space. Returns a (prediction, probabilities) tuple per document.
+    """
+    scorer = ml_models.get("scorer")
+    if scorer is not None:
+        return scorer.predict_batch(documents)
+
+    vectorizer = ml_models["vectorizer"]
+    model = ml_models["classifier"]
+
+    texts = [doc if isinstance(doc, str) else " ".join(doc) for doc in documents]
+
+    text_tfidf = vectorizer.transform(texts)
+    if is_linear_classifier(model):
+        return predict_linear(model, text_tfidf)
+
+    if hasattr(model, "predict_proba"):
+        # Derive labels from the probabilities instead of scoring twice
+        probabilities = model.predict_proba(text_tfidf)
+        predictions = model.classes_[np.argmax(probabilities, axis=1)]
+    else:
+        predictions = model.predict(text_tfidf)
+        probabilities = [None] * len(texts)
+
+    return list(zip(predictions, probabilities))
+
+
+def warmup_models() -> None:
+    """
+    Run one throwaway prediction so the first real request doesn't pay for
+    lazy imports, first-call code paths and page faults on the model arrays.
+    """
+    predict_batch(["warmup text for model"])
+
+    # Touch every page of the (possibly memory-mapped) weight arrays
+    np.sum(ml_models["classifier"].coef_)
+    if getattr(ml_models["vectorizer"], "use_idf", False):
+        np.sum(ml_models["vectorizer"].idf_)
+
+
+prediction_batcher = PredictionBatcher(
+    predict_batch,
+    max_batch_size=settings.BATCH_MAX_SIZE,
+    max_wait_ms=settings.BATCH_MAX_WAIT_MS,
+)
+
+# Per-process cache of model outputs keyed by a digest of the email text.
+# Lookups are exact on purpose: scoring a new email with the linear model is a
+# single sparse dot product, which is cheaper than a cosine-similarity search
+# over cached near-duplicates, and a similarity hit would return another email's
+# probabilities instead of this one's.
+prediction_cache = LRUCache(maxsize=settings.PREDICTION_CACHE_SIZE)
+
+# Background save of the prediction cache, if one is running
+prediction_cache_flush: Optional[asyncio.Task] = None
+
+
+def text_digest(*parts: str) -> bytes:
+    """
+    Compact content hash used as the prediction cache key.
+    Parts are hashed as if joined by a space, without building the joined string.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for i, part in enumerate(parts):
+        if i:
+            digest.update(b" ")
+        digest.update(part.encode())
+    return digest.digest()
+
+
+async def flush_prediction_cache() -> None:
+    """Write the prediction cache to disk without blocking the event loop."""
+    model_id = ml_models.get("fingerprint")
+    if not settings.PREDICTION_CACHE_PERSIST or model_id is None:
+        return
+
+    entries = prediction_cache.items()
+    prediction_cache.pending = 0
+    try:
+        count = await asyncio.get_running_loop().run_in_executor(
+            None, save_prediction_cache, entries, PREDICTION_CACHE_PATH, model_id
+        )
+        logger.debug("Saved %s cached predictions to %s", count, PREDICTION_CACHE_PATH)
+    except Exception as e:
+        logger.warning("Failed to save prediction cache: %s", e)
+
+
+def schedule_prediction_cache_flush() -> None:
+    """
+    Save the prediction cache in the background unless a save is running.
+    Keeps request latency independent of writing the .npz file.
+    """
+    global prediction_cache_flush
+    if prediction_cache_flush is None or prediction_cache_flush.done():
+        prediction_cache_flush = asyncio.create_task(flush_prediction_cache())
+
+
+def prepare_models() -> None:
+    """
+    Make the models ready to serve in this process.
+    Loads them unless they were preloaded before fork, then restores the
+    persisted prediction cache and runs the warmup prediction.
+    """
+    if "ready" not in ml_models:
+        init_models()
+
+    if not ml_models.get("ready"):
+        return
+
+    # Restore predictions cached by previous runs of the same model
+    if settings.PREDICTION_CACHE_PERSIST:
+        try:
+            restored = load_prediction_cache(
+                prediction_cache,
+                PREDICTION_CACHE_PATH,
+                ml_models["fingerprint"],
+            )
+            logger.info("Restored %s cached predictions", restored)
+        except Exception as e:
+            logger.warning("Failed to load prediction cache: %s", e)
+
+    try:
+        warmup_models()
+        logger.info("Model warmup complete")
+    except Exception as e:
+        logger.warning("Model warmup failed: %s", e)
+
+
+def init_predict_process() -> None:
+    """Initializer for prediction worker processes: load and warm the models once."""
+    if "ready" not in ml_models:
+        init_models()
+    if ml_models.get("ready"):
+        warmup_models()
+
+
+def create_predict_pool(default_pool: ThreadPoolExecutor) -> Executor:
+    """
+    Pick the executor that runs prediction batches.
+    "process" scores batches in separate interpreters so tokenization runs on
+    several cores at once; each process memory-maps the same model arrays.
+    """
+    if settings.PREDICT_EXECUTOR != "process":
+        return default_pool
+
+    # spawn: forking a process that already runs threads is unsafe
+    return ProcessPoolExecutor(
+        max_workers=settings.PREDICT_THREADS,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_predict_process,
+    )
+
+
+# Load models at import time so a preloading server (gunicorn --preload) forks
+# workers that share the model pages copy-on-write instead of each loading a copy
+if settings.PRELOAD_MODELS:
+    init_models()
+    # Keep the garbage collector from touching (and so copying) preloaded objects
+    gc.freeze()
+
+
+# -----------------------------
+# Lifespan Context (Startup/Shutdown)
+# -----------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Load models on startup and clean up on shutdown.
+    """
+    # Keep log formatting and I/O off the request path
+    log_listener = start_log_listener()
+
+    # Run CPU-bound model calls on a bounded pool so the event loop stays responsive
+    app.state.pool = ThreadPoolExecutor(
+        max_workers=settings.PREDICT_THREADS, thread_name_prefix="predict"
+    )
+    asyncio.get_running_loop().set_default_executor(app.state.pool)
+
+    # Load/warm the models on the pool while the database handshake is in flight,
+    # so startup takes max(models, database) instead of their sum
     logger.info("Connecting to MongoDB...")
-    db_connected = await db_manager.connect()
+    _, db_connected = await asyncio.gather(
+        asyncio.to_thread(prepare_models), db_manager.connect()
+    )
     if not db_connected:
         logger.warning("Database connection failed. Reports will not be available.")
 
+    connect_vt_redis()
+
+    # Start prediction batching
+    app.state.predict_pool = create_predict_pool(app.state.pool)
+    if app.state.predict_pool is not app.state.pool:
+        # Spawn (and warm) the worker processes now rather than on the first requests
+        await asyncio.gather(
+            *(
+                asyncio.get_running_loop().run_in_executor(
+                    app.state.predict_pool, os.getpid
+                )
+                for _ in range(settings.PREDICT_THREADS)
+            )
+        )
+    await prediction_batcher.start(executor=app.state.predict_pool)
+
     yield
 
     # Clean up resources
     logger.info("Shutting down...")
+    await prediction_batcher.stop()
+    if prediction_cache_flush is not None:
+        await prediction_cache_flush
+    if prediction_cache.pending:
+        await flush_prediction_cache()
+    if app.state.predict_pool is not app.state.pool:
+        app.state.predict_pool.shutdown(wait=False, cancel_futures=True)
+    app.state.pool.shutdown(wait=False, cancel_futures=True)
     await db_manager.disconnect()
+    await close_vt_session()
+    await close_vt_redis()
+    prediction_cache.clear()
     ml_models.clear()
     logger.info("Shutdown complete.")
+    stop_log_listener(log_listener)
 
 
 # -----------------------------
@@ -109,6 +473,19 @@ class PredictionResponse(BaseModel):
     attachments_info: Optional[List[Dict[str, Any]]] = None
 
 
+class EmailInput(BaseModel):
+    subject: str = Field(..., examples=["Congratulations, you won"])
+    body: str = Field(..., examples=["Click here to claim your free prize"])
+
+
+class BatchPredictionRequest(BaseModel):
+    emails: List[EmailInput] = Field(..., min_length=1, max_length=MAX_BATCH_EMAILS)
+
+
+class BatchPredictionResponse(BaseModel):
+    results: List[PredictionResponse]
+
+
 class HealthResponse(BaseModel):
     status: str
     models_loaded: bool
@@ -119,16 +496,17 @@ class HealthResponse(BaseModel):
 class AttachmentInfo(BaseModel):
     """Model for file attachment information"""
 
-    filename: str = Field(..., example="BITDEFENDER.txt")
-    content_type: str = Field(..., example="text/plain")
-    size: int = Field(..., example=23)
+    filename: str = Field(..., examples=["BITDEFENDER.txt"])
+    content_type: str = Field(..., examples=["text/plain"])
+    size: int = Field(..., examples=[23])
     sha256: str = Field(
-        ..., example="6f2eda4c0fa513cb4081ed255744531acbaa5c0e08d7d60dec7789704ff4afbc"
+        ...,
+        examples=["6f2eda4c0fa513cb4081ed255744531acbaa5c0e08d7d60dec7789704ff4afbc"],
     )
-    malicious_score: float = Field(default=0.0, example=0.6678)
+    malicious_score: float = Field(default=0.0, examples=[0.6678])
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "filename": "BITDEFENDER.txt",
                 "content_type": "text/plain",
@@ -137,24 +515,25 @@ class AttachmentInfo(BaseModel):
                 "malicious_score": 0.6678,
             }
         }
+    )
 
 
 class ReportResponse(BaseModel):
     """Model for a single prediction report"""
 
-    id: str = Field(alias="_id", example="6938b2d719aeb1dd9e914755")
-    subject: str = Field(..., example="testsubject")
-    body: str = Field(..., example="this is test email body")
-    prediction: str = Field(..., example="spam")
-    confidence: float = Field(..., example=0.9391)
-    spam_probability: float = Field(..., example=0.9391)
-    ham_probability: float = Field(..., example=0.0609)
-    timestamp: str = Field(..., example="2025-12-09T23:37:59.433000")
+    id: str = Field(alias="_id", examples=["6938b2d719aeb1dd9e914755"])
+    subject: str = Field(..., examples=["testsubject"])
+    body: str = Field(..., examples=["this is test email body"])
+    prediction: str = Field(..., examples=["spam"])
+    confidence: float = Field(..., examples=[0.9391])
+    spam_probability: float = Field(..., examples=[0.9391])
+    ham_probability: float = Field(..., examples=[0.0609])
+    timestamp: str = Field(..., examples=["2025-12-09T23:37:59.433000"])
     attachments_info: Optional[List[AttachmentInfo]] = None
 
-    class Config:
-        populate_by_name = True
-        json_schema_extra = {
+    model_config = ConfigDict(
+        populate_by_name=True,
+        json_schema_extra={
             "example": {
                 "_id": "6938b2d719aeb1dd9e914755",
                 "subject": "testsubject",
@@ -165,17 +544,18 @@ class ReportResponse(BaseModel):
                 "ham_probability": 0.0609,
                 "timestamp": "2025-12-09T23:37:59.433000",
             }
-        }
+        },
+    )
 
 
 class AllReportsResponse(BaseModel):
     """Model for all reports response"""
 
-    total: int = Field(..., example=2)
+    total: int = Field(..., examples=[2])
     reports: List[Dict[str, Any]] = Field(...)
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "total": 2,
                 "reports": [
@@ -211,6 +591,7 @@ class AllReportsResponse(BaseModel):
                 ],
             }
         }
+    )
 
 
 # -----------------------------
@@ -221,8 +602,18 @@ app = FastAPI(
     description="AI-powered email spam/phishing detection API",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
+# Refuse oversized uploads from Content-Length before the body is read
+# (added first so CORS headers still wrap the 413)
+app.add_middleware(RequestSizeLimitMiddleware, max_body_size=settings.MAX_REQUEST_SIZE)
+
+# Opt-in security headers, rate limiting and request logging; nothing is added
+# unless enabled in settings (added before CORS so 429 responses still carry
+# CORS headers)
+setup_middleware(app)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -231,10 +622,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large JSON payloads such as /reports; small responses pass through.
+# Brotli compresses repetitive JSON tighter than gzip at similar CPU and still
+# serves gzip to clients that don't accept br
+if settings.ENABLE_GZIP:
+    if BrotliMiddleware is not None:
+        app.add_middleware(
+            BrotliMiddleware, quality=4, minimum_size=1024, gzip_fallback=True
+        )
+    else:
+        app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 
 # -----------------------------
 # VirusTotal Integration
 # -----------------------------
+class UploadClosedError(Exception):
+    """The upload a shared VirusTotal scan needed was closed by its request."""
+
+
 async def get_vt_file_report(
     session: aiohttp.ClientSession, sha256: str
 ) -> Optional[Dict]:
@@ -245,25 +651,29 @@ async def get_vt_file_report(
 
     url = f"{VT_BASE}/files/{sha256}"
     try:
-        async with session.get(url) as resp:
+        async with vt_semaphore, session.get(url) as resp:
             if resp.status == 200:
-                return await resp.json()
+                return await resp.json(loads=orjson.loads)
             elif resp.status == 404:
                 return None
             else:
                 logger.error(
-                    f"VT file report failed: {resp.status} {await resp.text()}"
+                    "VT file report failed: %s %s", resp.status, await resp.text()
                 )
                 return None
     except Exception as e:
-        logger.error(f"Error getting VT file report: {e}")
+        logger.error("Error getting VT file report: %s", e)
         return None
 
 
 async def upload_file_to_vt(
-    session: aiohttp.ClientSession, file_content: bytes, filename: str
+    session: aiohttp.ClientSession, file_content: Union[bytes, BinaryIO], filename: str
 ) -> Optional[str]:
-    """Upload file to VirusTotal and return analysis ID"""
+    """
+    Upload file to VirusTotal and return analysis ID
+    File objects are streamed by aiohttp, reading in its executor, and are
+    closed once sent.
+    """
     if not VT_API_KEY:
         return None
 
@@ -272,18 +682,27 @@ async def upload_file_to_vt(
     data.add_field("file", file_content, filename=filename)
 
     try:
-        async with session.post(url, data=data) as resp:
+        async with vt_semaphore, session.post(url, data=data) as resp:
             if resp.status not in (200, 202):
-                logger.error(f"VT upload failed: {resp.status} {await resp.text()}")
+                logger.error("VT upload failed: %s %s", resp.status, await resp.text())
                 return None
 
-            json_resp = await resp.json()
+            json_resp = await resp.json(loads=orjson.loads)
             return json_resp["data"]["id"]  # analysis_id
     except Exception as e:
-        logger.error(f"Error uploading to VT: {e}")
+        logger.error("Error uploading to VT: %s", e)
         return None
 
 
+def retry_after_seconds(resp: aiohttp.ClientResponse, default: float = 5.0) -> float:
+    """Read a Retry-After header given in seconds, capped at ANALYSIS_POLL_MAX."""
+    try:
+        delay = float(resp.headers.get("Retry-After", default))
+    except ValueError:  # HTTP-date form
+        delay = default
+    return min(max(delay, 0.0), ANALYSIS_POLL_MAX)
+
+
 async def get_vt_analysis(
     session: aiohttp.ClientSession, analysis_id: str
 ) -> Optional[Dict]:
@@ -293,21 +712,36 @@ async def get_vt_analysis(
 
     url = f"{VT_BASE}/analyses/{analysis_id}"
     try:
-        async with session.get(url) as resp:
-            if resp.status != 200:
-                logger.error(f"VT analysis fetch failed: {resp.status}")
-                return None
-            return await resp.json()
+        for _ in range(VT_RATE_LIMIT_RETRIES):
+            async with vt_semaphore, session.get(url) as resp:
+                if resp.status == 200:
+                    return await resp.json(loads=orjson.loads)
+                if resp.status != 429:
+                    logger.error("VT analysis fetch failed: %s", resp.status)
+                    return None
+                delay = retry_after_seconds(resp)
+
+            # Rate limited: wait as long as VT asks instead of failing the scan
+            logger.warning("VT rate limit hit; retrying in %.0fs", delay)
+            await asyncio.sleep(delay)
+
+        logger.error("VT analysis fetch still rate limited; giving up")
+        return None
     except Exception as e:
-        logger.error(f"Error getting VT analysis: {e}")
+        logger.error("Error getting VT analysis: %s", e)
         return None
 
 
 async def wait_for_vt_analysis(
     session: aiohttp.ClientSession, analysis_id: str
 ) -> Optional[Dict]:
-    """Wait for VirusTotal analysis to complete"""
-    start = time.time()
+    """
+    Wait for VirusTotal analysis to complete
+    Polls with a growing interval: small files usually finish within seconds,
+    while slow analyses don't burn API quota on frequent polls.
+    """
+    deadline = time.monotonic() + ANALYSIS_TIMEOUT
+    delay = ANALYSIS_POLL_INITIAL
 
     while True:
         analysis = await get_vt_analysis(session, analysis_id)
@@ -320,17 +754,23 @@ async def wait_for_vt_analysis(
         if status_value == "completed":
             return analysis
 
-        if time.time() - start > ANALYSIS_TIMEOUT:
+        if time.monotonic() > deadline:
             logger.error("VT analysis timed out")
             return None
 
-        await asyncio.sleep(ANALYSIS_POLL_INTERVAL)
+        # Jitter keeps concurrent scans from polling VT in lockstep
+        await asyncio.sleep(delay + random.uniform(0, ANALYSIS_POLL_JITTER))
+        delay = min(delay * ANALYSIS_POLL_BACKOFF, ANALYSIS_POLL_MAX)
 
 
 def extract_vt_score(report: Dict) -> float:
-    """Extract malicious score from VT report"""
+    """
+    Extract malicious score from a VT file report or completed analysis
+    (file reports carry last_analysis_stats, analyses carry stats)
+    """
     try:
-        stats = report["data"]["attributes"]["last_analysis_stats"]
+        attributes = report["data"]["attributes"]
+        stats = attributes.get("last_analysis_stats") or attributes["stats"]
         total = sum(stats.values())
 
         if total == 0:
@@ -344,94 +784,306 @@ def extract_vt_score(report: Dict) -> float:
 
         return round(malicious_ratio, 4)
     except Exception as e:
-        logger.error(f"Error extracting VT score: {e}")
+        logger.error("Error extracting VT score: %s", e)
         return 0.0
 
 
-async def scan_file_with_vt(
-    file_content: bytes, filename: str, sha256_hash: str
+def get_vt_session() -> aiohttp.ClientSession:
+    """
+    Return the shared VirusTotal session, creating it on first use.
+    Reusing one session keeps connections to VT alive across scans instead of
+    paying a TCP and TLS handshake for every attachment.
+    """
+    global vt_session
+    if vt_session is None or vt_session.closed:
+        vt_session = aiohttp.ClientSession(
+            headers=VT_HEADERS,
+            connector=aiohttp.TCPConnector(
+                # vt_semaphore caps requests in flight; the spare connections
+                # stay warm between bursts
+                limit=MAX_VT_CONCURRENCY * 2,
+                ttl_dns_cache=300,
+                keepalive_timeout=75,
+            ),
+            # A stalled VT request would otherwise hold its semaphore slot for
+            # aiohttp's default 5 minutes
+            timeout=aiohttp.ClientTimeout(total=VT_REQUEST_TIMEOUT, sock_connect=10),
+        )
+    return vt_session
+
+
+async def close_vt_session() -> None:
+    """Close the shared VirusTotal session if one was opened."""
+    global vt_session
+    if vt_session is not None:
+        await vt_session.close()
+        vt_session = None
+
+
+def digest_file(fileobj: BinaryIO) -> Tuple[str, int]:
+    """Compute the SHA256 of a file object from its start; returns (hex digest, size)."""
+    fileobj.seek(0)
+    digest = hashlib.file_digest(fileobj, "sha256").hexdigest()
+    return digest, fileobj.tell()
+
+
+async def hash_upload(file: UploadFile) -> Tuple[str, int]:
+    """
+    Compute the SHA256 of an upload straight from its spooled file.
+    hashlib.file_digest streams through OpenSSL with the GIL released, so one
+    worker-thread hop replaces a read/await per chunk and no copy is kept in memory.
+
+    Returns:
+        Tuple of (hex digest, bytes read)
+    """
+    return await asyncio.to_thread(digest_file, file.file)
+
+
+async def lookup_vt_score(sha256_hash: str) -> Optional[float]:
+    """
+    Return a cached VirusTotal score from this worker or, when configured,
+    from Redis, where verdicts found by any worker are shared.
+    """
+    score = vt_score_cache.get(sha256_hash)
+    if score is not None or vt_redis is None:
+        return score
+
+    try:
+        async with vt_redis.pipeline(transaction=False) as pipe:
+            pipe.get(VT_REDIS_PREFIX + sha256_hash)
+            pipe.ttl(VT_REDIS_PREFIX + sha256_hash)
+            value, ttl = await pipe.execute()
+    except Exception as e:
+        logger.warning("Redis VT cache lookup failed: %s", e)
+        return None
+
+    if value is None:
+        return None
+    score = float(value)
+    # Keep it locally for whatever lifetime Redis has left
+    if ttl > 0:
+        vt_score_cache.set(sha256_hash, score, ttl=ttl)
+    return score
+
+
+async def cache_vt_score(
+    sha256_hash: str, score: float, ttl: Optional[int] = None
 ) -> float:
+    """Remember a VirusTotal score for ttl seconds (VT_CACHE_TTL by default)."""
+    if ttl is None:
+        ttl = settings.VT_CACHE_TTL
+    vt_score_cache.set(sha256_hash, score, ttl=ttl)
+
+    if vt_redis is not None:
+        try:
+            await vt_redis.set(VT_REDIS_PREFIX + sha256_hash, score, ex=ttl)
+        except Exception as e:
+            logger.warning("Redis VT cache write failed: %s", e)
+    return score
+
+
+def connect_vt_redis() -> None:
+    """Open the shared VT verdict cache when REDIS_URL is set."""
+    global vt_redis
+    if not settings.REDIS_URL:
+        return
+    if Redis is None:
+        logger.warning("REDIS_URL is set but redis is not installed; skipping.")
+        return
+    vt_redis = Redis.from_url(settings.REDIS_URL)
+    logger.info("Sharing VirusTotal verdicts through Redis")
+
+
+async def close_vt_redis() -> None:
+    """Close the Redis connection if one was opened."""
+    global vt_redis
+    if vt_redis is not None:
+        await vt_redis.aclose()
+        vt_redis = None
+
+
+async def scan_file_with_vt(file: UploadFile, sha256_hash: str) -> float:
     """
     Scan file with VirusTotal
+    The file content is only read when VT has no existing report for the hash.
     Returns malicious score (0.0 to 1.0)
     """
+    filename = file.filename
     if not VT_API_KEY:
         logger.warning("VT_API_KEY not set. Skipping VirusTotal scan.")
         return 0.0
 
     try:
-        async with aiohttp.ClientSession(headers=VT_HEADERS) as session:
-            # Step 1: Check if file already analyzed
-            logger.info(
-                f"Checking VT for existing analysis of {filename} (SHA256: {sha256_hash})"
-            )
-            report = await get_vt_file_report(session, sha256_hash)
+        session = get_vt_session()
 
-            if report:
-                logger.info(f"Found existing VT report for {filename}")
-                return extract_vt_score(report)
+        # Each VT call holds a vt_semaphore slot only while the request is in
+        # flight, so hash lookups for other attachments aren't queued behind
+        # this file's upload and polling sleeps
 
-            # Step 2: Upload file for analysis
-            logger.info(f"No existing report found. Uploading {filename} to VT...")
-            analysis_id = await upload_file_to_vt(session, file_content, filename)
+        # Step 1: Check if file already analyzed
+        logger.info(
+            "Checking VT for existing analysis of %s (SHA256: %s)",
+            filename,
+            sha256_hash,
+        )
+        report = await get_vt_file_report(session, sha256_hash)
+
+        if report:
+            logger.info("Found existing VT report for %s", filename)
+            return await cache_vt_score(sha256_hash, extract_vt_score(report))
+
+        # Step 2: Upload file for analysis
+        logger.info("No existing report found. Uploading %s to VT...", filename)
+        if file.file.closed:
+            # The request that started this shared scan has already finished
+            raise UploadClosedError(filename)
+        await file.seek(0)
+        if file.size is not None and file.size > VT_STREAM_THRESHOLD:
+            # Already spooled to disk: stream it instead of copying it into
+            # memory (nothing reads the upload after this)
+            file_content = file.file
+        else:
+            file_content = await file.read()
+        analysis_id = await upload_file_to_vt(session, file_content, filename)
 
-            if not analysis_id:
-                logger.error(f"Failed to upload {filename} to VT")
-                return 0.0
+        if not analysis_id:
+            logger.error("Failed to upload %s to VT", filename)
+            return 0.0
 
-            logger.info(
-                f"File uploaded. Analysis ID: {analysis_id}. Waiting for completion..."
-            )
+        logger.info(
+            "File uploaded. Analysis ID: %s. Waiting for completion...", analysis_id
+        )
 
-            # Step 3: Wait for analysis to complete
-            await wait_for_vt_analysis(session, analysis_id)
+        # Step 3: Wait for analysis to complete; the completed analysis already
+        # holds the engine stats, so the file report is only fetched as a
+        # fallback when polling failed
+        report = await wait_for_vt_analysis(session, analysis_id)
 
-            # Step 4: Get final report
+        # Step 4: Get final report
+        if not report:
             report = await get_vt_file_report(session, sha256_hash)
 
-            if report:
-                score = extract_vt_score(report)
-                logger.info(
-                    f"VT analysis complete for {filename}. Malicious score: {score}"
-                )
-                return score
-            else:
-                logger.error(f"Failed to retrieve final report for {filename}")
-                return 0.0
+        if report:
+            score = await cache_vt_score(sha256_hash, extract_vt_score(report))
+            logger.info(
+                "VT analysis complete for %s. Malicious score: %s", filename, score
+            )
+            return score
+        else:
+            # The upload went through but the analysis is still pending; remember
+            # that briefly so resends of the file don't upload it again
+            logger.error("Failed to retrieve final report for %s", filename)
+            return await cache_vt_score(
+                sha256_hash, 0.0, ttl=settings.VT_PENDING_CACHE_TTL
+            )
 
+    except UploadClosedError:
+        raise
     except Exception as e:
-        logger.error(f"Error during VT scan of {filename}: {e}", exc_info=True)
+        logger.error("Error during VT scan of %s: %s", filename, e, exc_info=True)
         return 0.0
 
 
+async def shared_vt_scan(file: UploadFile, sha256_hash: str) -> float:
+    """
+    Scan a file with VirusTotal, joining any scan of the same hash in progress.
+    Identical attachments (in one request or across concurrent requests) are
+    looked up and uploaded once instead of once per copy.
+    """
+    task = vt_scans.get(sha256_hash)
+    if task is None:
+        task = asyncio.create_task(scan_file_with_vt(file, sha256_hash))
+        vt_scans[sha256_hash] = task
+        task.add_done_callback(lambda _: vt_scans.pop(sha256_hash, None))
+    try:
+        # Shielded so one client disconnecting doesn't cancel the scan for the others
+        return await asyncio.shield(task)
+    except UploadClosedError:
+        # The scan was reading another request's upload, which has since been
+        # closed; scan again from this request's own copy
+        if file.file.closed:
+            logger.warning("Upload %s closed before it could be scanned", file.filename)
+            return 0.0
+        return await shared_vt_scan(file, sha256_hash)
+
+
+async def process_attachment(file: UploadFile) -> Dict[str, Any]:
+    """
+    Hash an attachment and scan it with VirusTotal.
+    Errors are logged and reported as an unscored attachment so one bad file
+    doesn't fail the others.
+    """
+    file_size = 0
+    sha256_hash = None
+    malicious_score = 0.0
+
+    try:
+        # Calculate SHA256 hash without buffering the whole file
+        sha256_hash, bytes_read = await hash_upload(file)
+        file_size = file.size if file.size is not None else bytes_read
+
+        # Reuse recent verdicts for attachments seen before (campaigns resend
+        # the same files); otherwise scan, sharing any scan already in flight
+        cached_score = await lookup_vt_score(sha256_hash)
+        if cached_score is not None:
+            malicious_score = cached_score
+        else:
+            malicious_score = await shared_vt_scan(file, sha256_hash)
+
+    except Exception as e:
+        logger.error("Error processing file %s: %s", file.filename, e, exc_info=True)
+
+    return {
+        "filename": file.filename,
+        "content_type": file.content_type,
+        "size": file_size,
+        "sha256": sha256_hash,
+        "malicious_score": malicious_score,
+    }
+
+
 # -----------------------------
 # Prediction Logic
 # -----------------------------
+async def get_models() -> Dict[str, Any]:
+    """
+    Dependency providing the loaded ML models.
+    Declared async so FastAPI awaits it inline instead of dispatching to its threadpool.
+    """
+    return ml_models
+
+
 async def run_prediction(
-    subject: str, body: str, attachments_info: Optional[List[Dict[str, Any]]] = None
+    models: Dict[str, Any],
+    subject: str,
+    body: str,
+    attachments_info: Optional[List[Dict[str, Any]]] = None,
 ) -> Dict[str, Any]:
-    if not ml_models.get("ready"):
+    if not models.get("ready"):
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail=f"Models not loaded: {ml_models.get('error', 'Unknown error')}",
+            detail=f"Models not loaded: {models.get('error', 'Unknown error')}",
         )
 
     try:
-        text = f"{subject} {body}".strip()
-
-        vectorizer = ml_models["vectorizer"]
-        model = ml_models["classifier"]
-
-        # Transform and Predict
-        text_tfidf = vectorizer.transform([text])
-
-        prediction = model.predict(text_tfidf)[0]
-
-        # Get Probabilities
-        if hasattr(model, "predict_proba"):
-            probabilities = model.predict_proba(text_tfidf)[0]
-            ham_prob = float(probabilities[0])
-            spam_prob = float(probabilities[1])
+        # Score subject and body as one document without concatenating them
+        document = tuple(part for part in (subject.strip(), body.strip()) if part)
+
+        # Reuse the model output for emails we have already scored
+        text_hash = text_digest(*document)
+        cached = prediction_cache.get(text_hash)
+        if cached is not None:
+            prediction, probabilities = cached
+        else:
+            # Transform and Predict (coalesced with concurrent requests)
+            prediction, probabilities = await prediction_batcher.submit(document)
+            prediction_cache.set(text_hash, (prediction, probabilities))
+            if prediction_cache.pending >= settings.PREDICTION_CACHE_FLUSH_EVERY:
+                schedule_prediction_cache_flush()
+
+        # Get Probabilities (rounded in one vectorized call)
+        if probabilities is not None:
+            ham_prob, spam_prob = np.round(probabilities, 4).tolist()
         else:
             spam_prob = 1.0 if prediction == 1 else 0.0
             ham_prob = 1.0 - spam_prob
@@ -441,18 +1093,16 @@ async def run_prediction(
 
         result = {
             "prediction": prediction_label,
-            "confidence": round(confidence, 4),
-            "spam_probability": round(spam_prob, 4),
-            "ham_probability": round(ham_prob, 4),
+            "confidence": confidence,
+            "spam_probability": spam_prob,
+            "ham_probability": ham_prob,
+            "attachments_info": attachments_info,
         }
 
-        if attachments_info:
-            result["attachments_info"] = attachments_info
-
         return result
 
     except Exception as e:
-        logger.error(f"Prediction logic error: {e}", exc_info=True)
+        logger.error("Prediction logic error: %s", e, exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Internal processing error during prediction: {str(e)}",
@@ -467,16 +1117,34 @@ async def home():
     return {"message": "Welcome to the Phishing Email Detection System API."}
 
 
+# Encoded /health bodies keyed by (models_loaded, database_connected, error)
+health_payloads: Dict[Tuple[bool, bool, Optional[str]], bytes] = {}
+
+
+def health_payload(is_ready: bool, db_connected: bool, error: Optional[str]) -> bytes:
+    """Return the JSON health body for a state, encoding it once per state."""
+    key = (is_ready, db_connected, error)
+    payload = health_payloads.get(key)
+    if payload is None:
+        payload = orjson.dumps(
+            {
+                "status": "healthy" if (is_ready and db_connected) else "unhealthy",
+                "models_loaded": is_ready,
+                "database_connected": db_connected,
+                "error": error,
+            }
+        )
+        health_payloads[key] = payload
+    return payload
+
+
 @app.get("/health", response_model=HealthResponse, tags=["Health"])
-async def health_check():
-    is_ready = ml_models.get("ready", False)
-    db_connected = db_manager.is_connected
-    return {
-        "status": "healthy" if (is_ready and db_connected) else "unhealthy",
-        "models_loaded": is_ready,
-        "database_connected": db_connected,
-        "error": ml_models.get("error"),
-    }
+async def health_check(models: Dict[str, Any] = Depends(get_models)):
+    # Probes hit this constantly; serve pre-encoded bytes and skip validation
+    payload = health_payload(
+        models.get("ready", False), db_manager.is_connected, models.get("error")
+    )
+    return Response(content=payload, media_type="application/json")
 
 
 @app.post("/predict", response_model=PredictionResponse, tags=["Prediction"])
@@ -484,6 +1152,7 @@ async def predict(
     subject: str = Form(...),
     body: str = Form(...),
     files: List[UploadFile] = File(default=[]),
+    models: Dict[str, Any] = Depends(get_models),
 ):
     # Validate inputs
     if not subject or not subject.strip():
@@ -497,47 +1166,24 @@ async def predict(
             detail="Body cannot be empty",
         )
 
-    # Process attachments
-    attachments_info = []
-    if files:
-        for file in files:
-            if file.filename:  # Check if file actually has content
-                # Read file content and calculate hash
-                file_size = 0
-                sha256_hash = None
-                malicious_score = 0.0
-
-                try:
-                    # Read file content
-                    file_content = await file.read()
-                    file_size = len(file_content)
-
-                    # Calculate SHA256 hash
-                    hash_object = hashlib.sha256(file_content)
-                    sha256_hash = hash_object.hexdigest()
-
-                    # Scan with VirusTotal
-                    malicious_score = await scan_file_with_vt(
-                        file_content, file.filename, sha256_hash
-                    )
-
-                except Exception as e:
-                    logger.error(
-                        f"Error processing file {file.filename}: {e}", exc_info=True
-                    )
-
-                attachments_info.append(
-                    {
-                        "filename": file.filename,
-                        "content_type": file.content_type,
-                        "size": file_size,
-                        "sha256": sha256_hash,
-                        "malicious_score": malicious_score,
-                    }
-                )
+    # Reject oversized attachments before any of them is hashed or scanned
+    for file in files:
+        if file.size is not None and file.size > settings.MAX_UPLOAD_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Attachment {file.filename} exceeds the {settings.MAX_UPLOAD_SIZE} byte limit",
+            )
+
+    # Process attachments concurrently (results keep the upload order)
+    attachments_info = list(
+        await asyncio.gather(
+            *(process_attachment(file) for file in files if file.filename)
+        )
+    )
 
     # Run prediction
     result = await run_prediction(
+        models,
         subject.strip(),
         body.strip(),
         attachments_info if attachments_info else None,
@@ -562,24 +1208,86 @@ async def predict(
             # Save to database
             saved_id = await db_manager.save_prediction(db_document)
             if saved_id:
-                logger.info(f"Prediction saved to database with ID: {saved_id}")
+                logger.info("Prediction saved to database with ID: %s", saved_id)
             else:
                 logger.warning("Failed to save prediction to database")
         else:
             logger.warning("Database not connected. Prediction not saved.")
     except Exception as db_error:
         # Log error but don't fail the request
-        logger.error(f"Database error during save: {db_error}", exc_info=True)
+        logger.error("Database error during save: %s", db_error, exc_info=True)
+
+    # The result is built here already in PredictionResponse's shape; returning a
+    # response directly skips FastAPI's per-request response_model validation
+    return ORJSONResponse(content=result)
 
-    return result
+
+@app.post("/predict/batch", response_model=BatchPredictionResponse, tags=["Prediction"])
+async def predict_batch_endpoint(
+    request: BatchPredictionRequest,
+    models: Dict[str, Any] = Depends(get_models),
+):
+    """
+    Classify several emails (without attachments) in one request.
+
+    Results are returned in the order the emails were sent. The emails are
+    scored together by the prediction batcher instead of one model call each.
+    """
+    # Validate inputs
+    for index, email in enumerate(request.emails):
+        if not email.subject.strip():
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Subject cannot be empty (email {index})",
+            )
+        if not email.body.strip():
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Body cannot be empty (email {index})",
+            )
+
+    emails = [(email.subject.strip(), email.body.strip()) for email in request.emails]
+
+    # Submit every email at once so they coalesce into shared model calls
+    results = await asyncio.gather(
+        *(run_prediction(models, subject, body) for subject, body in emails)
+    )
+
+    # Save to database only after successful prediction
+    try:
+        if db_manager.is_connected:
+            db_documents = [
+                {
+                    "subject": subject,
+                    "body": body,
+                    "prediction": result["prediction"],
+                    "confidence": result["confidence"],
+                    "spam_probability": result["spam_probability"],
+                    "ham_probability": result["ham_probability"],
+                }
+                for (subject, body), result in zip(emails, results)
+            ]
+            if await db_manager.save_predictions(db_documents) is None:
+                logger.warning("Failed to save batch predictions to database")
+        else:
+            logger.warning("Database not connected. Batch predictions not saved.")
+    except Exception as db_error:
+        # Log error but don't fail the request
+        logger.error("Database error during batch save: %s", db_error, exc_info=True)
+
+    return ORJSONResponse(content={"results": results})
 
 
 @app.get("/reports", response_model=AllReportsResponse, tags=["Reports"])
-async def get_all_reports(request: Request):
+async def get_all_reports(
+    request: Request,
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_REPORTS_PAGE_SIZE),
+    offset: int = Query(default=0, ge=0),
+):
     """
-    Retrieve all prediction reports from the database.
+    Retrieve prediction reports from the database.
 
-    Returns a list of all stored predictions with metadata including:
+    Returns a list of stored predictions with metadata including:
     - Email subject and body
     - Prediction verdict (spam/ham)
     - Confidence scores
@@ -587,12 +1295,17 @@ async def get_all_reports(request: Request):
     - Timestamp of prediction
 
     The reports are sorted by timestamp in descending order (newest first).
+    Pass `limit` (and optionally `offset`) to fetch a single page; `total` is
+    then the number of reports in the whole collection, and the email body is
+    left out (fetch it from `/report?id=`). Without `limit` every report is
+    returned in full.
     """
-    # Reject any query parameters
-    if request.query_params:
+    # Reject any other query parameters
+    unknown_params = set(request.query_params) - {"limit", "offset"}
+    if unknown_params:
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail="This endpoint does not accept any query parameters.",
+            detail="This endpoint only accepts the 'limit' and 'offset' query parameters.",
         )
 
     try:
@@ -603,8 +1316,15 @@ async def get_all_reports(request: Request):
                 detail="Database is not connected. Reports are unavailable.",
             )
 
-        # Fetch all reports
-        reports = await db_manager.get_all_reports()
+        # Fetch a single page when requested, otherwise all reports
+        if limit is not None:
+            page = await db_manager.get_reports_page(
+                limit, offset, projection=REPORT_LIST_PROJECTION
+            )
+            reports, total = page if page is not None else (None, 0)
+        else:
+            reports = await db_manager.get_all_reports()
+            total = len(reports) if reports is not None else 0
 
         if reports is None:
             raise HTTPException(
@@ -612,15 +1332,14 @@ async def get_all_reports(request: Request):
                 detail="Failed to retrieve reports from database.",
             )
 
-        return {
-            "total": len(reports),
-            "reports": reports,
-        }
+        # Skip response_model validation of every stored report; the documents
+        # are already JSON-ready and the model only documents the schema
+        return ORJSONResponse(content={"total": total, "reports": reports})
 
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error in /reports endpoint: {e}", exc_info=True)
+        logger.error("Error in /reports endpoint: %s", e, exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"An error occurred while fetching reports: {str(e)}",
@@ -630,7 +1349,9 @@ async def get_all_reports(request: Request):
 @app.get("/report", response_model=ReportResponse, tags=["Reports"])
 async def get_report_by_id(
     id: str = Query(
-        ..., description="Report ID to retrieve", example="6938b2d719aeb1dd9e914755"
+        ...,
+        description="Report ID to retrieve",
+        examples=["6938b2d719aeb1dd9e914755"],
     )
 ):
     """
@@ -680,12 +1401,15 @@ async def get_report_by_id(
                 detail=f"Report with ID '{id}' not found. Please check the ID and try again.",
             )
 
-        return report
+        # Stored documents are already JSON-ready; encode them with orjson
+        # directly instead of re-validating through ReportResponse
+        report.setdefault("attachments_info", None)
+        return ORJSONResponse(content=report)
 
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error in /report endpoint: {e}", exc_info=True)
+        logger.error("Error in /report endpoint: %s", e, exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"An error occurred while fetching the report: {str(e)}",
@@ -695,4 +1419,4 @@ async def get_report_by_id(
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run(app, host="0.0.0.0", port=5000)
+    uvicorn.run(app, host="0.0.0.0", port=5000, loop="uvloop", http="httptools")
@@ -0,0 +1,144 @@
+"""
+Prediction Batching
+Coalesces concurrent prediction requests into a single vectorizer/classifier call.
+"""
+
+import asyncio
+import logging
+from concurrent.futures import Executor
+from typing import Any, Callable, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger("Phishing-Email-Detection-System-API.Batcher")
+
+
+class PredictionBatcher:
+    """
+    Micro-batching queue for ML inference.
+    Requests arriving within a short window are scored together so the sparse
+    transform and matrix multiply run once per batch instead of once per email.
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[List[Any]], Sequence[Any]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 10.0,
+    ):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._executor: Optional[Executor] = None
+        self._inflight: Set[asyncio.Task] = set()
+
+    @property
+    def is_running(self) -> bool:
+        """Check if the background batching task is active."""
+        return self._worker is not None and not self._worker.done()
+
+    async def start(self, executor: Optional[Executor] = None) -> None:
+        """
+        Start the background task that drains the queue.
+
+        Args:
+            executor: Pool used to run predict_fn off the event loop
+                      (defaults to the loop's default executor)
+        """
+        if self.is_running:
+            return
+        self._executor = executor
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+        logger.info(
+            "Prediction batcher started (max_batch_size=%s, max_wait=%.1fms)",
+            self.max_batch_size,
+            self.max_wait * 1000,
+        )
+
+    async def stop(self) -> None:
+        """Stop the background task and fail any requests still queued."""
+        if self._worker is None:
+            return
+
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+        # Let batches already handed to the executor finish
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+        while self._queue is not None and not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Prediction batcher stopped"))
+        logger.info("Prediction batcher stopped")
+
+    async def submit(self, text: Any) -> Any:
+        """
+        Queue a single text for prediction and wait for its result row.
+
+        Args:
+            text: Preprocessed email text (or any document predict_fn accepts)
+
+        Returns:
+            The row produced by predict_fn for this text
+        """
+        if not self.is_running:
+            raise RuntimeError("Prediction batcher is not running")
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    def _drain(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        """Move queued items into the batch without waiting."""
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+    async def _run(self) -> None:
+        """Collect up to max_batch_size items or wait max_wait, then score them."""
+        while True:
+            batch = [await self._queue.get()]
+            self._drain(batch)
+
+            # Give concurrent requests a short window to join the batch, but only
+            # while another batch is still being scored; an idle batcher sends a
+            # lone request straight through instead of adding max_wait latency
+            if (
+                len(batch) < self.max_batch_size
+                and self.max_wait > 0
+                and self._inflight
+            ):
+                await asyncio.sleep(self.max_wait)
+                self._drain(batch)
+
+            # Score in the background so the next batch can start collecting
+            task = asyncio.create_task(self._process(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _process(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        """Run one prediction call for the batch and resolve each future."""
+        texts = [text for text, _ in batch]
+        try:
+            rows = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self.predict_fn, texts
+            )
+        except Exception as e:
+            logger.error("Batch prediction failed: %s", e, exc_info=True)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), row in zip(batch, rows):
+            # Skip requests whose client went away while waiting
+            if not future.done():
+                future.set_result(row)
+
+        logger.debug("Processed prediction batch of %s", len(batch))
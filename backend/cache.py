@@ -3,69 +3,256 @@ Caching Layer
 Implements in-memory caching for frequent database queries and ML predictions.
 """
 
-from typing import Optional, Any
-from datetime import datetime, timedelta
+from typing import Optional, Any, List, Tuple
+from collections import OrderedDict
 import hashlib
-import json
+import heapq
+import logging
+import os
+import pickle
+import threading
+import time
+
+import numpy as np
+import orjson
+
+logger = logging.getLogger("Phishing-Email-Detection-System-API.Cache")
 
 
 class SimpleCache:
-    """Thread-safe in-memory cache with TTL support"""
+    """
+    Thread-safe in-memory cache with TTL support.
+    Bounded to maxsize entries with least-recently-used eviction; expiry times
+    are kept in a heap so cleanup only touches entries that have expired.
+    """
     
-    def __init__(self, default_ttl: int = 300):
-        self._cache: dict = {}
-        self._expiry: dict = {}
+    def __init__(self, default_ttl: int = 300, maxsize: int = 1024):
+        self._cache: OrderedDict = OrderedDict()  # key -> (value, expires_at)
+        self._heap: List[Tuple[float, str]] = []  # (expires_at, key)
+        self._lock = threading.Lock()
         self.default_ttl = default_ttl
+        self.maxsize = maxsize
     
-    def _is_expired(self, key: str) -> bool:
-        """Check if cache entry is expired"""
-        if key not in self._expiry:
-            return True
-        return datetime.utcnow() > self._expiry[key]
+    def __len__(self) -> int:
+        return len(self._cache)
     
     def get(self, key: str) -> Optional[Any]:
         """Get value from cache"""
-        if key in self._cache and not self._is_expired(key):
-            return self._cache[key]
-        # Clean up expired entry
-        if key in self._cache:
-            del self._cache[key]
-            del self._expiry[key]
-        return None
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if time.monotonic() > expires_at:
+                # Clean up expired entry
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return value
     
     def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
-        """Set value in cache with TTL"""
-        self._cache[key] = value
-        ttl = ttl or self.default_ttl
-        self._expiry[key] = datetime.utcnow() + timedelta(seconds=ttl)
+        """Set value in cache with TTL, evicting the least recently used entry if full"""
+        now = time.monotonic()
+        expires_at = now + (ttl or self.default_ttl)
+        with self._lock:
+            self._cache[key] = (value, expires_at)
+            self._cache.move_to_end(key)
+            heapq.heappush(self._heap, (expires_at, key))
+            # Free the slots of expired entries before evicting live ones
+            if len(self._cache) > self.maxsize:
+                self._remove_expired(now)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+            # Overwritten and evicted keys leave stale heap entries; compact
+            # once they outnumber the live ones so the heap stays bounded
+            if len(self._heap) > 2 * len(self._cache) + 64:
+                self._heap = [
+                    (expires_at, key)
+                    for key, (_, expires_at) in self._cache.items()
+                ]
+                heapq.heapify(self._heap)
     
     def delete(self, key: str) -> None:
         """Delete key from cache"""
-        if key in self._cache:
-            del self._cache[key]
-        if key in self._expiry:
-            del self._expiry[key]
+        with self._lock:
+            self._cache.pop(key, None)
     
     def clear(self) -> None:
         """Clear all cache"""
-        self._cache.clear()
-        self._expiry.clear()
+        with self._lock:
+            self._cache.clear()
+            self._heap.clear()
     
     def cleanup_expired(self) -> int:
         """Remove all expired entries, return count"""
-        expired_keys = [
-            key for key in self._cache.keys()
-            if self._is_expired(key)
-        ]
-        for key in expired_keys:
-            self.delete(key)
-        return len(expired_keys)
+        with self._lock:
+            return self._remove_expired(time.monotonic())
+    
+    def _remove_expired(self, now: float) -> int:
+        """Pop expired entries off the heap; the caller holds the lock"""
+        removed = 0
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._heap)
+            entry = self._cache.get(key)
+            # Skip heap entries for keys since overwritten or removed
+            if entry is not None and entry[1] == expires_at:
+                del self._cache[key]
+                removed += 1
+        return removed
     
     @staticmethod
     def generate_key(*args, **kwargs) -> str:
         """Generate cache key from arguments"""
-        key_data = json.dumps({"args": args, "kwargs": kwargs}, sort_keys=True)
-        return hashlib.md5(key_data.encode()).hexdigest()
+        # A pickle stream is cheaper to build than repr or JSON; blake2b beats md5
+        key_data = pickle.dumps((args, tuple(sorted(kwargs.items()))), protocol=5)
+        return hashlib.blake2b(
+            key_data, digest_size=16, usedforsecurity=False
+        ).hexdigest()
+
+
+class LRUCache:
+    """Bounded in-memory cache with least-recently-used eviction"""
+    
+    def __init__(self, maxsize: int = 8192):
+        self._cache: OrderedDict = OrderedDict()
+        self.maxsize = maxsize
+        self.pending = 0  # entries added since the last save
+    
+    def __len__(self) -> int:
+        return len(self._cache)
+    
+    def get(self, key: Any) -> Optional[Any]:
+        """Get value from cache and mark it as recently used"""
+        try:
+            self._cache.move_to_end(key)
+        except KeyError:
+            return None
+        return self._cache[key]
+    
+    def set(self, key: Any, value: Any) -> None:
+        """Set value in cache, evicting the least recently used entry if full"""
+        if key not in self._cache:
+            self.pending += 1
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+    
+    def items(self) -> List[Tuple[Any, Any]]:
+        """Snapshot of entries, least recently used first"""
+        return list(self._cache.items())
+
+    def clear(self) -> None:
+        """Clear all cache"""
+        self._cache.clear()
+        self.pending = 0
+
+
+class RedisCache:
+    """
+    Cache shared by every API worker through Redis.
+    Values are stored as JSON with a TTL; Redis errors are logged and treated as misses.
+    Listing keys embed an epoch counter, so one INCR invalidates every cached listing.
+    """
+    
+    def __init__(self, client: Any, prefix: str = "reports:v1:"):
+        self.client = client
+        self.prefix = prefix
+    
+    async def get(self, key: str) -> Optional[Any]:
+        """Get value from Redis if present"""
+        try:
+            data = await self.client.get(self.prefix + key)
+        except Exception as e:
+            logger.warning("Redis cache get failed: %s", e)
+            return None
+        return None if data is None else orjson.loads(data)
+    
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        """Set value in Redis with a TTL in seconds"""
+        try:
+            await self.client.set(self.prefix + key, orjson.dumps(value), ex=ttl)
+        except Exception as e:
+            logger.warning("Redis cache set failed: %s", e)
+    
+    async def delete(self, key: str) -> None:
+        """Delete key from Redis"""
+        try:
+            await self.client.delete(self.prefix + key)
+        except Exception as e:
+            logger.warning("Redis cache delete failed: %s", e)
+    
+    async def epoch(self) -> Optional[int]:
+        """Current listing epoch, or None if Redis is unavailable"""
+        try:
+            data = await self.client.get(self.prefix + "epoch")
+        except Exception as e:
+            logger.warning("Redis cache get failed: %s", e)
+            return None
+        return int(data or 0)
+    
+    async def bump_epoch(self) -> None:
+        """Invalidate every cached listing; stale keys expire on their own"""
+        try:
+            await self.client.incr(self.prefix + "epoch")
+        except Exception as e:
+            logger.warning("Redis cache invalidation failed: %s", e)
+    
+    async def close(self) -> None:
+        """Close the Redis connection"""
+        await self.client.aclose()
+
+
+def save_prediction_cache(
+    entries: List[Tuple[bytes, Tuple[Any, Any]]], path: str, model_id: str
+) -> int:
+    """
+    Write (digest, (prediction, probabilities)) entries to an .npz file.
+    The file is replaced atomically so concurrent workers never read a partial write.
+    Returns the number of entries written.
+    """
+    rows = [
+        (digest, prediction, probabilities)
+        for digest, (prediction, probabilities) in entries
+        if probabilities is not None
+    ]
+    if not rows:
+        return 0
+
+    # Digests are stored as a uint8 matrix; numpy byte strings drop trailing NULs
+    digests = np.frombuffer(b"".join(row[0] for row in rows), dtype=np.uint8)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            model_id=np.array(model_id),
+            digests=digests.reshape(len(rows), -1),
+            predictions=np.array([row[1] for row in rows]),
+            probabilities=np.array([row[2] for row in rows], dtype=np.float64),
+        )
+    os.replace(tmp_path, path)
+    return len(rows)
+
+
+def load_prediction_cache(cache: LRUCache, path: str, model_id: str) -> int:
+    """
+    Fill an LRUCache from a file written by save_prediction_cache.
+    Files written for a different model are ignored. Returns the number of entries loaded.
+    """
+    if not os.path.exists(path):
+        return 0
+
+    with np.load(path) as data:
+        if str(data["model_id"]) != model_id:
+            return 0
+        digests = data["digests"]
+        predictions = data["predictions"]
+        probabilities = data["probabilities"]
+
+    for digest, prediction, row in zip(digests, predictions, probabilities):
+        cache.set(digest.tobytes(), (prediction, row))
+    cache.pending = 0
+    return len(digests)
 
 
 # Global cache instance
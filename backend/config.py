@@ -5,7 +5,7 @@ Centralized configuration with validation and environment-based settings.
 
 import os
 from typing import Optional
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
 
 
@@ -38,28 +38,52 @@ class Settings(BaseSettings):
     MONGO_DB_NAME: str = "phishing_detection"
     MONGO_MAX_POOL_SIZE: int = 50
     MONGO_MIN_POOL_SIZE: int = 10
+    MONGO_WRITE_BATCH_SIZE: int = 100  # predictions inserted per insert_many
 
     # ML Models
     MODELS_DIR: str = "models"
     MODEL_FILENAME: str = "spam_classifier_model.pkl"
     VECTORIZER_FILENAME: str = "tfidf_vectorizer.pkl"
+    PRELOAD_MODELS: bool = False  # load at import time, before workers fork
+
+    # Prediction Batching
+    BATCH_MAX_SIZE: int = 32
+    BATCH_MAX_WAIT_MS: float = 10.0  # milliseconds
+    PREDICT_THREADS: int = os.cpu_count() or 1
+    PREDICT_EXECUTOR: str = "thread"  # "thread" or "process"
+
+    # Prediction Cache
+    PREDICTION_CACHE_SIZE: int = 8192  # entries
+    PREDICTION_CACHE_PERSIST: bool = True
+    PREDICTION_CACHE_FLUSH_EVERY: int = 1000  # new entries between saves
+
+    # VirusTotal Verdict Cache
+    VT_CACHE_SIZE: int = 4096  # entries
+    VT_CACHE_TTL: int = 3600  # seconds
+    VT_PENDING_CACHE_TTL: int = 300  # seconds to skip re-uploading unfinished scans
+    REDIS_URL: Optional[str] = (
+        None  # share verdicts across workers, e.g. redis://redis:6379/0
+    )
 
     # File Upload
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
+    MAX_REQUEST_SIZE: int = 50 * 1024 * 1024  # 50MB, whole request body
     ALLOWED_EXTENSIONS: set = {".txt", ".pdf", ".doc", ".docx", ".jpg", ".png"}
 
     # Performance
     ENABLE_GZIP: bool = True
     CACHE_TTL: int = 300  # 5 minutes
 
-    # Rate Limiting
-    RATE_LIMIT_ENABLED: bool = True
+    # Optional Middleware (each adds a layer to every request, so off by default)
+    SECURITY_HEADERS_ENABLED: bool = False
+    REQUEST_LOGGING_ENABLED: bool = False
+
+    # Rate Limiting (per worker unless REDIS_URL is set)
+    RATE_LIMIT_ENABLED: bool = False
     RATE_LIMIT_REQUESTS: int = 100
     RATE_LIMIT_WINDOW: int = 60  # seconds
 
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
+    model_config = SettingsConfigDict(env_file=".env", case_sensitive=True)
 
 
 @lru_cache()
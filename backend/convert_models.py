@@ -0,0 +1,47 @@
+"""
+Model Conversion
+One-shot script that re-encodes the pickled models as raw numpy arrays.
+
+The API loads the .npy arrays when present, which avoids unpickling the
+scikit-learn objects at startup and lets worker processes memory-map the
+coefficients instead of each holding a private copy. Re-run after
+retraining the models.
+
+The .pkl fallback is loaded with joblib's mmap_mode="r", which only maps
+arrays from uncompressed dumps: save retrained models with
+joblib.dump(obj, path, compress=0).
+
+Usage:
+    python convert_models.py
+"""
+
+import os
+import logging
+import joblib
+from inference import save_classifier_arrays, save_vectorizer_arrays
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
+logger = logging.getLogger("convert_models")
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(BASE_DIR, "models")
+MODEL_PATH = os.path.join(MODELS_DIR, "spam_classifier_model.pkl")
+VECTORIZER_PATH = os.path.join(MODELS_DIR, "tfidf_vectorizer.pkl")
+MODEL_ARRAYS_DIR = os.path.join(MODELS_DIR, "classifier")
+VECTORIZER_ARRAYS_DIR = os.path.join(MODELS_DIR, "vectorizer")
+
+
+def main():
+    logger.info("Loading %s", MODEL_PATH)
+    classifier = joblib.load(MODEL_PATH)
+    logger.info("Loading %s", VECTORIZER_PATH)
+    vectorizer = joblib.load(VECTORIZER_PATH)
+
+    save_classifier_arrays(classifier, MODEL_ARRAYS_DIR)
+    logger.info("Wrote %s", MODEL_ARRAYS_DIR)
+    save_vectorizer_arrays(vectorizer, VECTORIZER_ARRAYS_DIR)
+    logger.info("Wrote %s", VECTORIZER_ARRAYS_DIR)
+
+
+if __name__ == "__main__":
+    main()
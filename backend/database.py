@@ -4,12 +4,20 @@ Implements secure connection pooling for high-concurrency scenarios.
 """
 
 import os
+import asyncio
 import logging
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple, Awaitable, Callable
 from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
-from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
-from cache import cache
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import (
+    BulkWriteError,
+    ConnectionFailure,
+    ServerSelectionTimeoutError,
+)
+from cache import RedisCache, cache
 
 try:
     from config import settings
@@ -18,8 +26,40 @@ try:
 except ImportError:
     USE_CONFIG = False
 
+try:
+    from redis.asyncio import Redis
+except ImportError:  # redis is optional; report caching then stays per worker
+    Redis = None
+
 logger = logging.getLogger("Phishing-Email-Detection-System-API.Database")
 
+# Documents fetched per round trip when listing every report
+REPORTS_BATCH_SIZE = 1000
+
+# Server-side time limit for single-report lookups (an _id lookup is sub-ms)
+REPORT_LOOKUP_MAX_TIME_MS = 250
+
+# Aggregation stage that renders _id and timestamp as strings on the server.
+# Used by listings and single reports alike so both format a document the same
+# way; values of unexpected types are passed through instead of failing the query
+REPORT_STRING_FIELDS = {
+    "$addFields": {
+        "_id": {"$convert": {"input": "$_id", "to": "string", "onError": "$_id"}},
+        "timestamp": {
+            "$cond": [
+                {"$eq": [{"$type": "$timestamp"}, "date"]},
+                {
+                    "$dateToString": {
+                        "date": "$timestamp",
+                        "format": "%Y-%m-%dT%H:%M:%S.%L000",
+                    }
+                },
+                "$timestamp",
+            ]
+        },
+    }
+}
+
 
 class DatabaseManager:
     """
@@ -31,6 +71,17 @@ class DatabaseManager:
         self.client: Optional[AsyncIOMotorClient] = None
         self.db: Optional[AsyncIOMotorDatabase] = None
         self._is_connected: bool = False
+        # Pending (document, future) pairs written by the background writer
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self.write_batch_size = settings.MONGO_WRITE_BATCH_SIZE if USE_CONFIG else 100
+        # Report queries in progress, shared by concurrent cache misses
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # Bumped on every invalidation; listing queries that started before it
+        # neither get joined afterwards nor write their results to the cache
+        self._reports_generation = 0
+        # Report cache shared by all workers, when REDIS_URL is set
+        self.shared_cache: Optional[RedisCache] = None
 
     async def connect(self) -> bool:
         """
@@ -59,20 +110,26 @@ class DatabaseManager:
             # Build connection URI with authentication
             mongo_uri = f"mongodb://{mongo_username}:{mongo_password}@{mongo_host}:{mongo_port}/"
 
-            logger.info(f"Connecting to MongoDB at {mongo_host}:{mongo_port}...")
+            logger.info("Connecting to MongoDB at %s:%s...", mongo_host, mongo_port)
 
             # Create client with optimized connection pool settings
             self.client = AsyncIOMotorClient(
                 mongo_uri,
                 maxPoolSize=max_pool,
                 minPoolSize=min_pool,
+                # Idle sockets are closed well before typical NAT/LB idle timeouts
                 maxIdleTimeMS=45000,
                 serverSelectionTimeoutMS=5000,
                 connectTimeoutMS=10000,
-                socketTimeoutMS=45000,
+                socketTimeoutMS=15000,  # Fail hung operations instead of waiting 45s
+                waitQueueTimeoutMS=2000,  # Fail fast when the pool is exhausted
                 retryWrites=True,
                 retryReads=True,  # Also retry read operations
                 w="majority",  # Write concern for data safety
+                # Compress replies (large report listings); zstd when the
+                # backports.zstd module is installed, zlib otherwise
+                compressors="zstd,zlib",
+                maxConnecting=4,  # Parallel handshakes when the pool grows
             )
 
             # Get database reference
@@ -85,37 +142,66 @@ class DatabaseManager:
             # Create indexes for better query performance
             await self._create_indexes()
 
+            # Start coalescing prediction inserts
+            self._start_writer()
+            self._connect_shared_cache()
+
             logger.info("✓ MongoDB connection established successfully!")
             return True
 
         except (ConnectionFailure, ServerSelectionTimeoutError) as e:
-            logger.error(f"✗ Failed to connect to MongoDB: {e}")
+            logger.error("✗ Failed to connect to MongoDB: %s", e)
             self._is_connected = False
             return False
         except Exception as e:
-            logger.error(f"✗ Unexpected error during MongoDB connection: {e}")
+            logger.error("✗ Unexpected error during MongoDB connection: %s", e)
             self._is_connected = False
             return False
 
     async def _create_indexes(self):
         """Create database indexes for optimized queries."""
         try:
-            # Index on timestamp for sorting reports by date
-            await self.db.predictions.create_index([("timestamp", -1)])
-            # Index on prediction for filtering
-            await self.db.predictions.create_index("prediction")
-            # Compound index for common queries
-            await self.db.predictions.create_index(
-                [("prediction", 1), ("timestamp", -1)]
+            # Sent as one createIndexes command instead of a round trip per index
+            await self.db.predictions.create_indexes(
+                [
+                    # Index on timestamp for sorting reports by date
+                    IndexModel([("timestamp", DESCENDING)]),
+                    # Index on prediction for filtering
+                    IndexModel([("prediction", ASCENDING)]),
+                    # Compound index for common queries
+                    IndexModel([("prediction", ASCENDING), ("timestamp", DESCENDING)]),
+                    # Index on SHA256 for attachment lookups
+                    IndexModel([("attachments_info.sha256", ASCENDING)]),
+                ]
             )
-            # Index on SHA256 for attachment lookups
-            await self.db.predictions.create_index("attachments_info.sha256")
             logger.info("Database indexes created successfully")
         except Exception as e:
-            logger.warning(f"Failed to create indexes: {e}")
+            logger.warning("Failed to create indexes: %s", e)
+
+    def _connect_shared_cache(self) -> None:
+        """Share cached reports through Redis when REDIS_URL is set."""
+        redis_url = settings.REDIS_URL if USE_CONFIG else os.getenv("REDIS_URL")
+        if not redis_url or self.shared_cache is not None:
+            return
+        if Redis is None:
+            logger.warning("REDIS_URL is set but redis is not installed; skipping.")
+            return
+        self.shared_cache = RedisCache(Redis.from_url(redis_url))
+        logger.info("Sharing cached reports through Redis")
+
+    async def _invalidate_reports(self) -> None:
+        """Drop cached report listings after new predictions are saved."""
+        self._reports_generation += 1
+        cache.delete("all_reports")
+        if self.shared_cache is not None:
+            await self.shared_cache.bump_epoch()
 
     async def disconnect(self):
         """Close MongoDB connection and cleanup resources."""
+        await self._stop_writer()
+        if self.shared_cache is not None:
+            await self.shared_cache.close()
+            self.shared_cache = None
         if self.client:
             self.client.close()
             self._is_connected = False
@@ -148,21 +234,187 @@ class DatabaseManager:
                 "timestamp": datetime.utcnow(),
             }
 
-            # Insert document
-            result = await self.db.predictions.insert_one(document)
+            if self._writer is not None and not self._writer.done():
+                # Hand the document to the background writer, which inserts
+                # concurrent saves together with one insert_many
+                future = asyncio.get_running_loop().create_future()
+                await self._write_queue.put((document, future))
+                inserted_id = await future
+                if inserted_id is None:
+                    return None
+            else:
+                # Insert document
+                result = await self.db.predictions.insert_one(document)
+                inserted_id = str(result.inserted_id)
+
+                # Invalidate cache since we have new data
+                await self._invalidate_reports()
+
+            logger.info("Prediction saved successfully with ID: %s", inserted_id)
+            return inserted_id
+
+        except Exception as e:
+            logger.error("Failed to save prediction: %s", e, exc_info=True)
+            return None
+
+    def _start_writer(self) -> None:
+        """Start the background task that batches prediction inserts."""
+        if self._writer is not None and not self._writer.done():
+            return
+        self._write_queue = asyncio.Queue()
+        self._writer = asyncio.create_task(self._write_loop())
+
+    async def _stop_writer(self) -> None:
+        """Write any queued predictions, then stop the background writer."""
+        if self._writer is None:
+            return
+
+        # The sentinel lets the writer finish the batches queued before it
+        await self._write_queue.put(None)
+        await self._writer
+        self._writer = None
+
+    async def _write_loop(self) -> None:
+        """
+        Insert queued predictions in batches until the stop sentinel arrives.
+        One batch is written at a time, so saves arriving while an insert is in
+        flight are grouped into the next one; a lone save is written at once.
+        """
+        while True:
+            item = await self._write_queue.get()
+            batch = []
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.write_batch_size or self._write_queue.empty():
+                    break
+                item = self._write_queue.get_nowait()
+
+            if batch:
+                await self._write_batch(batch)
+            if item is None:
+                return
+
+    async def _write_batch(
+        self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]
+    ) -> None:
+        """Insert one batch and resolve each waiting save with its ID (or None)."""
+        documents = [document for document, _ in batch]
+        failed = set()
+        try:
+            await self.db.predictions.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            # Unordered inserts keep going past failures; only fail those rows
+            failed = {error["index"] for error in e.details.get("writeErrors", [])}
+            logger.error("Failed to save %s of %s predictions", len(failed), len(batch))
+        except Exception as e:
+            failed = set(range(len(batch)))
+            logger.error("Failed to save predictions: %s", e, exc_info=True)
+
+        # Invalidate cache once for the whole batch
+        if len(failed) < len(batch):
+            await self._invalidate_reports()
+
+        for index, (document, future) in enumerate(batch):
+            if not future.done():
+                # insert_many assigns each document's _id before sending it
+                future.set_result(None if index in failed else str(document["_id"]))
+
+        logger.debug("Wrote prediction batch of %s", len(batch))
+
+    async def save_predictions(
+        self, predictions: List[Dict[str, Any]]
+    ) -> Optional[List[str]]:
+        """
+        Save several prediction records with a single insert_many call.
+
+        Args:
+            predictions: List of dictionaries containing prediction information
+
+        Returns:
+            List of inserted document IDs as strings, or None on failure
+        """
+        if not self.is_connected or self.db is None:
+            logger.error("Cannot save predictions: Database not connected")
+            return None
+
+        try:
+            timestamp = datetime.utcnow()
+            documents = [{**data, "timestamp": timestamp} for data in predictions]
+
+            # One round trip for the whole batch
+            result = await self.db.predictions.insert_many(documents, ordered=False)
 
-            inserted_id = str(result.inserted_id)
+            inserted_ids = [str(inserted_id) for inserted_id in result.inserted_ids]
 
             # Invalidate cache since we have new data
-            cache.delete("all_reports")
+            await self._invalidate_reports()
 
-            logger.info(f"Prediction saved successfully with ID: {inserted_id}")
-            return inserted_id
+            logger.info("Saved %s predictions in one batch", len(inserted_ids))
+            return inserted_ids
 
         except Exception as e:
-            logger.error(f"Failed to save prediction: {e}", exc_info=True)
+            logger.error("Failed to save predictions: %s", e, exc_info=True)
             return None
 
+    async def _single_flight(
+        self, key: str, query: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Run query() once for concurrent callers with the same key.
+        Requests that miss the cache together (e.g. right after an invalidation)
+        share the result of one MongoDB query instead of each running it.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(query())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so one cancelled request doesn't cancel the query for the others
+        return await asyncio.shield(task)
+
+    async def _query_all_reports(self) -> List[Dict[str, Any]]:
+        """Fetch every report, newest first, with string ids and timestamps."""
+        # Fetch all documents, sorted by timestamp (newest first), in large
+        # batches rather than the driver's default 101-document first batch.
+        # ObjectId and datetime are converted to strings by the server
+        cursor = self.db.predictions.aggregate(
+            [{"$sort": {"timestamp": -1}}, REPORT_STRING_FIELDS],
+            batchSize=REPORTS_BATCH_SIZE,
+        )
+        return await cursor.to_list(length=None)
+
+    async def _query_reports_page(
+        self, limit: int, offset: int, projection: Optional[Dict[str, int]]
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """Fetch one page of reports and the collection's document count."""
+        pipeline = [
+            {"$sort": {"timestamp": -1}},
+            {"$skip": offset},
+            {"$limit": limit},
+        ]
+        if projection:
+            pipeline.append({"$project": projection})
+        # ObjectId and datetime are converted to strings by the server
+        pipeline.append(REPORT_STRING_FIELDS)
+
+        # Whole page in the first reply instead of 101 docs plus getMores
+        cursor = self.db.predictions.aggregate(pipeline, batchSize=limit)
+        reports = await cursor.to_list(length=limit)
+        # Collection metadata count; avoids scanning every document per page
+        total = await self.db.predictions.estimated_document_count()
+        return reports, total
+
+    async def _query_report(self, object_id: ObjectId) -> Optional[Dict[str, Any]]:
+        """Fetch one report by ObjectId, with a string id and timestamp."""
+        # Find document; the detail view shows every field, body included.
+        # Converted by the same stage as the listings so both format it alike
+        cursor = self.db.predictions.aggregate(
+            [{"$match": {"_id": object_id}}, {"$limit": 1}, REPORT_STRING_FIELDS],
+            maxTimeMS=REPORT_LOOKUP_MAX_TIME_MS,
+        )
+        reports = await cursor.to_list(length=1)
+        return reports[0] if reports else None
+
     async def get_all_reports(
         self, use_cache: bool = True
     ) -> Optional[List[Dict[str, Any]]]:
@@ -178,33 +430,109 @@ class DatabaseManager:
             return None
 
         try:
-            # Try cache first
+            generation = self._reports_generation
+
+            # Try cache first; the shared cache is invalidated by any worker
+            shared_key = None
             if use_cache:
                 cache_key = "all_reports"
-                cached = cache.get(cache_key)
+                if self.shared_cache is None:
+                    cached = cache.get(cache_key)
+                else:
+                    epoch = await self.shared_cache.epoch()
+                    if epoch is not None:
+                        shared_key = f"list:{epoch}:all"
+                    cached = shared_key and await self.shared_cache.get(shared_key)
                 if cached is not None:
-                    logger.debug(f"Cache hit for all reports ({len(cached)} reports)")
+                    logger.debug("Cache hit for all reports (%s reports)", len(cached))
                     return cached
 
-            # Fetch all documents, sorted by timestamp (newest first)
-            cursor = self.db.predictions.find().sort("timestamp", -1)
-            reports = await cursor.to_list(length=None)
-
-            # Convert ObjectId and datetime to string for JSON serialization
-            for report in reports:
-                report["_id"] = str(report["_id"])
-                if "timestamp" in report and isinstance(report["timestamp"], datetime):
-                    report["timestamp"] = report["timestamp"].isoformat()
+            # Concurrent cache misses share one query instead of each hitting
+            # MongoDB; keyed by epoch/generation so nobody joins a pre-save query
+            reports = await self._single_flight(
+                shared_key or f"all_reports:{generation}", self._query_all_reports
+            )
 
-            # Cache the results
-            if use_cache:
+            # Cache the results, unless a save invalidated them mid-query
+            if shared_key is not None:
+                await self.shared_cache.set(shared_key, reports, ttl=60)
+            elif (
+                use_cache
+                and self.shared_cache is None
+                and generation == self._reports_generation
+            ):
                 cache.set(cache_key, reports, ttl=60)  # Cache for 1 minute
 
-            logger.info(f"Retrieved {len(reports)} reports from database")
+            logger.info("Retrieved %s reports from database", len(reports))
             return reports
 
         except Exception as e:
-            logger.error(f"Failed to fetch reports: {e}", exc_info=True)
+            logger.error("Failed to fetch reports: %s", e, exc_info=True)
+            return None
+
+    async def get_reports_page(
+        self,
+        limit: int,
+        offset: int = 0,
+        projection: Optional[Dict[str, int]] = None,
+    ) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+        """
+        Retrieve one page of prediction reports, newest first.
+        Only the requested window is fetched, so memory stays bounded however
+        large the collection grows.
+
+        Args:
+            limit: Maximum number of reports to return
+            offset: Number of newest reports to skip
+            projection: Optional MongoDB projection, e.g. {"body": 0}
+
+        Returns:
+            Tuple of (reports, total reports in the collection), or None on failure
+        """
+        if not self.is_connected or self.db is None:
+            logger.error("Cannot fetch reports: Database not connected")
+            return None
+
+        try:
+            generation = self._reports_generation
+
+            # Pages are only cached when Redis lets every worker invalidate them
+            shared_key = None
+            if self.shared_cache is not None:
+                epoch = await self.shared_cache.epoch()
+                if epoch is not None:
+                    fields = ",".join(
+                        f"{field}={value}"
+                        for field, value in sorted((projection or {}).items())
+                    )
+                    shared_key = f"list:{epoch}:{offset}:{limit}:{fields}"
+                    cached = await self.shared_cache.get(shared_key)
+                    if cached is not None:
+                        logger.debug("Cache hit for reports page (offset=%s)", offset)
+                        return cached["reports"], cached["total"]
+
+            reports, total = await self._single_flight(
+                shared_key
+                or f"page:{generation}:{offset}:{limit}:"
+                f"{sorted((projection or {}).items())}",
+                lambda: self._query_reports_page(limit, offset, projection),
+            )
+
+            if shared_key is not None:
+                await self.shared_cache.set(
+                    shared_key, {"reports": reports, "total": total}, ttl=60
+                )
+
+            logger.info(
+                "Retrieved %s of %s reports from database (offset=%s)",
+                len(reports),
+                total,
+                offset,
+            )
+            return reports, total
+
+        except Exception as e:
+            logger.error("Failed to fetch reports page: %s", e, exc_info=True)
             return None
 
     async def get_report_by_id(
@@ -229,41 +557,42 @@ class DatabaseManager:
             if use_cache:
                 cache_key = f"report_{report_id}"
                 cached = cache.get(cache_key)
+                if cached is None and self.shared_cache is not None:
+                    cached = await self.shared_cache.get(f"byid:{report_id}")
+                    if cached is not None:
+                        cache.set(cache_key, cached, ttl=300)
                 if cached is not None:
-                    logger.debug(f"Cache hit for report {report_id}")
+                    logger.debug("Cache hit for report %s", report_id)
                     return cached
 
-            from bson import ObjectId
-            from bson.errors import InvalidId
-
             # Validate and convert to ObjectId
             try:
                 object_id = ObjectId(report_id)
             except InvalidId:
-                logger.warning(f"Invalid ObjectId format: {report_id}")
+                logger.warning("Invalid ObjectId format: %s", report_id)
                 return None
 
-            # Find document
-            report = await self.db.predictions.find_one({"_id": object_id})
+            report = await self._single_flight(
+                f"report_{report_id}", lambda: self._query_report(object_id)
+            )
 
             if report:
-                # Convert ObjectId and datetime to string
-                report["_id"] = str(report["_id"])
-                if "timestamp" in report and isinstance(report["timestamp"], datetime):
-                    report["timestamp"] = report["timestamp"].isoformat()
-
                 # Cache the result
                 if use_cache:
                     cache.set(cache_key, report, ttl=300)  # Cache for 5 minutes
+                    if self.shared_cache is not None:
+                        await self.shared_cache.set(
+                            f"byid:{report_id}", report, ttl=300
+                        )
 
-                logger.info(f"Retrieved report with ID: {report_id}")
+                logger.info("Retrieved report with ID: %s", report_id)
             else:
-                logger.info(f"No report found with ID: {report_id}")
+                logger.info("No report found with ID: %s", report_id)
 
             return report
 
         except Exception as e:
-            logger.error(f"Failed to fetch report by ID: {e}", exc_info=True)
+            logger.error("Failed to fetch report by ID: %s", e, exc_info=True)
             return None
 
 
@@ -0,0 +1,516 @@
+"""
+Model Inference
+Array-based model persistence and fused scoring for the TF-IDF + linear classifier pipeline.
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+from collections import Counter
+from itertools import chain
+from typing import Any, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from scipy.special import expit, softmax
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.naive_bayes import MultinomialNB
+
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover - numba is optional
+    njit = None
+
+logger = logging.getLogger("Phishing-Email-Detection-System-API.Inference")
+
+# Vectorizer parameters that affect transform() and can be stored as JSON
+VECTORIZER_PARAMS = (
+    "analyzer",
+    "lowercase",
+    "strip_accents",
+    "token_pattern",
+    "stop_words",
+    "ngram_range",
+    "binary",
+    "norm",
+    "use_idf",
+    "smooth_idf",
+    "sublinear_tf",
+)
+
+# scikit-learn's default token pattern and a boundary-free equivalent: a maximal
+# run of two or more word characters is always delimited by word boundaries, so
+# the \b assertions only cost time
+DEFAULT_TOKEN_PATTERN = r"(?u)\b\w\w+\b"
+FAST_TOKEN_PATTERN = r"(?u)\w\w+"
+
+# A document given as several parts (e.g. subject and body) is scored as the
+# parts joined by a single space
+Document = Union[str, Sequence[str]]
+
+# Norm codes understood by the scoring kernel
+NORM_CODES = {None: 0, "l1": 1, "l2": 2}
+
+
+# -----------------------------
+# Array Persistence
+# -----------------------------
+def save_vectorizer_arrays(vectorizer: TfidfVectorizer, directory: str) -> None:
+    """
+    Save a fitted TfidfVectorizer as uncompressed .npy arrays plus a params file.
+    Vocabulary is stored as sorted token strings with their int32 feature ids;
+    idf_ is written as float32 so it can be memory-mapped as-is.
+    """
+    if not isinstance(vectorizer, TfidfVectorizer):
+        raise TypeError(f"Unsupported vectorizer type: {type(vectorizer).__name__}")
+    if (
+        not isinstance(vectorizer.analyzer, str)
+        or vectorizer.tokenizer
+        or vectorizer.preprocessor
+    ):
+        raise ValueError("Vectorizers with custom callables cannot be stored as arrays")
+
+    os.makedirs(directory, exist_ok=True)
+    tokens = sorted(vectorizer.vocabulary_)
+    params = {name: getattr(vectorizer, name) for name in VECTORIZER_PARAMS}
+
+    np.save(os.path.join(directory, "tokens.npy"), np.array(tokens))
+    np.save(
+        os.path.join(directory, "ids.npy"),
+        np.array([vectorizer.vocabulary_[t] for t in tokens], dtype=np.int32),
+    )
+    np.save(
+        os.path.join(directory, "idf.npy"),
+        np.asarray(vectorizer.idf_, dtype=np.float32),
+    )
+    with open(os.path.join(directory, "params.json"), "w") as f:
+        json.dump(params, f, indent=2)
+
+
+def load_vectorizer_arrays(
+    directory: str, mmap_mode: Optional[str] = "r"
+) -> TfidfVectorizer:
+    """
+    Rebuild a predict-only TfidfVectorizer from saved arrays.
+    idf_ is memory-mapped by default so worker processes share its pages.
+    """
+    with open(os.path.join(directory, "params.json")) as f:
+        params = json.load(f)
+    params["ngram_range"] = tuple(params["ngram_range"])
+
+    tokens = np.load(os.path.join(directory, "tokens.npy"))
+    ids = np.load(os.path.join(directory, "ids.npy"))
+
+    vectorizer = TfidfVectorizer(**params)
+    vectorizer.vocabulary_ = dict(zip(tokens.tolist(), ids.tolist()))
+    if vectorizer.use_idf:
+        vectorizer.idf_ = np.load(
+            os.path.join(directory, "idf.npy"), mmap_mode=mmap_mode
+        )
+
+    return vectorizer
+
+
+def downcast_classifier(classifier: Any) -> Any:
+    """
+    Store linear model coefficients as float32.
+    Halves the bytes read by the sparse-dense product; classification does not
+    need float64 precision in the weights. Memory-mapped arrays are left as-is,
+    since casting would replace the shared mapping with a private copy.
+    """
+    for name in ("coef_", "intercept_"):
+        value = getattr(classifier, name, None)
+        if isinstance(value, np.ndarray) and not isinstance(value, np.memmap):
+            setattr(classifier, name, value.astype(np.float32, copy=False))
+    return classifier
+
+
+def downcast_vectorizer(vectorizer: Any) -> Any:
+    """
+    Store a TfidfVectorizer's idf weights as float32.
+    Same rationale as downcast_classifier: the weights are gathered per token
+    on every transform, and float32 halves the bytes without changing labels.
+    """
+    idf = getattr(getattr(vectorizer, "_tfidf", None), "idf_", None)
+    if isinstance(idf, np.ndarray) and not isinstance(idf, np.memmap):
+        vectorizer.idf_ = idf.astype(np.float32, copy=False)
+    return vectorizer
+
+
+def save_classifier_arrays(classifier: LogisticRegression, directory: str) -> None:
+    """
+    Save a fitted LogisticRegression's coefficients as uncompressed .npy arrays.
+    Coefficients are written as float32 so they can be memory-mapped as-is.
+    """
+    if not isinstance(classifier, LogisticRegression):
+        raise TypeError(f"Unsupported classifier type: {type(classifier).__name__}")
+
+    classifier = downcast_classifier(classifier)
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, "coef.npy"), classifier.coef_)
+    np.save(os.path.join(directory, "intercept.npy"), classifier.intercept_)
+    np.save(os.path.join(directory, "classes.npy"), classifier.classes_)
+
+
+def load_classifier_arrays(
+    directory: str, mmap_mode: Optional[str] = "r"
+) -> LogisticRegression:
+    """
+    Rebuild a predict-only LogisticRegression from saved arrays.
+    coef_ is memory-mapped by default so worker processes share its pages.
+    """
+    classifier = LogisticRegression()
+    classifier.coef_ = np.load(os.path.join(directory, "coef.npy"), mmap_mode=mmap_mode)
+    classifier.intercept_ = np.load(os.path.join(directory, "intercept.npy"))
+    classifier.classes_ = np.load(os.path.join(directory, "classes.npy"))
+    classifier.n_features_in_ = classifier.coef_.shape[1]
+
+    return classifier
+
+
+# -----------------------------
+# Load-time Preparation
+# -----------------------------
+def install_tokenizer(vectorizer: Any) -> None:
+    """
+    Compile the vectorizer's token pattern once and reuse it for every call.
+    TfidfVectorizer otherwise rebuilds its tokenizer on each transform().
+    """
+    if (
+        not isinstance(vectorizer, TfidfVectorizer)
+        or vectorizer.analyzer != "word"
+        or vectorizer.tokenizer is not None
+        or vectorizer.token_pattern is None
+    ):
+        return
+
+    pattern = vectorizer.token_pattern
+    if pattern == DEFAULT_TOKEN_PATTERN:
+        pattern = FAST_TOKEN_PATTERN
+
+    compiled = re.compile(pattern)
+    if compiled.groups > 1:
+        # Let scikit-learn raise its own error for ambiguous patterns
+        return
+
+    findall = compiled.findall
+    vectorizer.build_tokenizer = lambda: findall
+
+
+def model_fingerprint(classifier: Any, vectorizer: Any) -> str:
+    """
+    Hash the weights that determine predictions.
+    Used to tell whether persisted predictions belong to the loaded model.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    if is_linear_classifier(classifier):
+        weights, bias = linear_weights(classifier)
+    else:
+        weights = getattr(classifier, "coef_", None)
+        bias = getattr(classifier, "intercept_", None)
+    for value in (weights, bias, getattr(vectorizer, "idf_", None)):
+        if value is not None:
+            digest.update(np.ascontiguousarray(value).tobytes())
+    digest.update(str(len(getattr(vectorizer, "vocabulary_", ()))).encode())
+    return digest.hexdigest()
+
+
+def freeze_vocabulary(vectorizer: Any) -> None:
+    """
+    Strip per-call work that cannot change the output of transform().
+
+    The vocabulary is made a plain dict, and for unigram word analysis the
+    stop-word filter is dropped when no stop word is a vocabulary key: such
+    tokens are discarded by the vocabulary lookup anyway.
+    """
+    if not isinstance(vectorizer, TfidfVectorizer) or not hasattr(
+        vectorizer, "vocabulary_"
+    ):
+        return
+
+    if type(vectorizer.vocabulary_) is not dict:
+        vectorizer.vocabulary_ = dict(vectorizer.vocabulary_)
+
+    stop_words = vectorizer.get_stop_words()
+    if (
+        stop_words
+        and vectorizer.analyzer == "word"
+        and vectorizer.ngram_range == (1, 1)
+        and not any(word in vectorizer.vocabulary_ for word in stop_words)
+    ):
+        vectorizer.stop_words = None
+
+
+def prune_unused_features(classifier: Any, vectorizer: Any) -> int:
+    """
+    Drop vocabulary terms whose classifier weights are all zero.
+
+    Only applied when the vectorizer does not normalize rows: with an l1/l2 norm
+    every matched term contributes to the row norm, so removing a zero-weight
+    term would change the scores.
+
+    Returns:
+        Number of features removed
+    """
+    if (
+        not isinstance(vectorizer, TfidfVectorizer)
+        or vectorizer.norm is not None
+        or not hasattr(vectorizer, "vocabulary_")
+        or getattr(classifier, "coef_", None) is None
+    ):
+        return 0
+
+    keep = np.any(classifier.coef_ != 0, axis=0)
+    removed = int(keep.size - np.count_nonzero(keep))
+    if removed == 0:
+        # Leave (possibly memory-mapped) arrays untouched
+        return 0
+
+    new_ids = np.cumsum(keep) - 1
+    vectorizer.vocabulary_ = {
+        token: int(new_ids[i]) for token, i in vectorizer.vocabulary_.items() if keep[i]
+    }
+    if vectorizer.use_idf:
+        vectorizer.idf_ = np.asarray(vectorizer.idf_)[keep]
+    if hasattr(getattr(vectorizer, "_tfidf", None), "n_features_in_"):
+        # A fitted vectorizer's inner transformer validates the feature count
+        vectorizer._tfidf.n_features_in_ = len(vectorizer.vocabulary_)
+    classifier.coef_ = np.ascontiguousarray(classifier.coef_[:, keep])
+    classifier.n_features_in_ = classifier.coef_.shape[1]
+    return removed
+
+
+def prepare_for_inference(classifier: Any, vectorizer: Any) -> None:
+    """Apply load-time optimizations to a freshly loaded model pair."""
+    removed = prune_unused_features(classifier, vectorizer)
+    if removed:
+        logger.info("Pruned %s zero-weight features from the vocabulary", removed)
+    freeze_vocabulary(vectorizer)
+    install_tokenizer(vectorizer)
+
+
+# -----------------------------
+# Fused Scoring
+# -----------------------------
+def _score_kernel(
+    feature_ids: np.ndarray,
+    tf: np.ndarray,
+    idf: np.ndarray,
+    coef: np.ndarray,
+    intercept: np.ndarray,
+    norm_code: int,
+) -> np.ndarray:
+    """
+    Weight term frequencies by idf, normalize, and accumulate the matching
+    coefficient columns into the decision values in a single pass.
+    """
+    n = feature_ids.shape[0]
+    weights = np.empty(n)
+    total = 0.0
+    for k in range(n):
+        weights[k] = tf[k] * idf[feature_ids[k]]
+        if norm_code == 2:
+            total += weights[k] * weights[k]
+        else:
+            total += abs(weights[k])
+
+    scale = 1.0
+    if norm_code == 2:
+        scale = 1.0 / np.sqrt(total)
+    elif norm_code == 1:
+        scale = 1.0 / total
+
+    out = intercept.astype(np.float64)
+    for k in range(n):
+        w = weights[k] * scale
+        for c in range(coef.shape[0]):
+            out[c] += w * coef[c, feature_ids[k]]
+    return out
+
+
+# Compiled to native code when numba is installed; cache=True keeps the compiled
+# kernel on disk so restarts and new workers skip compilation
+score_kernel = njit(cache=True, fastmath=True)(_score_kernel) if njit else None
+
+
+def linear_weights(classifier: Any) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return the (weights [n_rows, n_features], bias [n_rows]) that score a row as
+    weights @ x + bias.
+
+    LogisticRegression uses its coefficients (one row for binary problems).
+    MultinomialNB's joint log-likelihood is linear in x as well: one row of
+    feature log-probabilities per class plus the class log-prior.
+    """
+    if isinstance(classifier, MultinomialNB):
+        return classifier.feature_log_prob_, classifier.class_log_prior_
+    return classifier.coef_, np.asarray(classifier.intercept_)
+
+
+def is_linear_classifier(classifier: Any) -> bool:
+    """Check if the classifier can be scored directly from linear weights."""
+    if isinstance(classifier, MultinomialNB):
+        return hasattr(classifier, "feature_log_prob_")
+    return isinstance(classifier, LogisticRegression) and hasattr(classifier, "coef_")
+
+
+def predict_linear(classifier: Any, X: Any) -> List[Tuple[Any, np.ndarray]]:
+    """
+    Score a vectorized batch with one sparse-dense product on the linear weights.
+    Equivalent to predict() plus predict_proba() without scikit-learn's input
+    validation or the second matrix multiply. Only the nonzero features of each
+    row touch the weights, so Naive Bayes costs O(classes * nnz) per row.
+
+    Returns:
+        List of (predicted class label, class probabilities) per row
+    """
+    weights, bias = linear_weights(classifier)
+    decision = np.asarray(X @ weights.T, dtype=np.float64)
+    decision += bias
+    classes = classifier.classes_
+
+    if decision.shape[1] == 1:
+        spam_prob = expit(decision[:, 0])
+        probabilities = np.column_stack([1.0 - spam_prob, spam_prob])
+        predictions = classes[(decision[:, 0] > 0).astype(np.intp)]
+    else:
+        probabilities = softmax(decision, axis=1)
+        predictions = classes[np.argmax(decision, axis=1)]
+
+    return list(zip(predictions, probabilities))
+
+
+class FusedLinearScorer:
+    """
+    Fuses a fitted TfidfVectorizer with a linear classifier.
+
+    Scoring an email is a tokenize -> vocabulary lookup -> weighted sum over
+    the matched features only, with no intermediate CSR matrix or scikit-learn
+    input validation. The model arrays are read in place, so memory-mapped
+    coefficients stay shared between worker processes.
+    """
+
+    def __init__(self, vectorizer: TfidfVectorizer, classifier: Any):
+        self.analyzer = vectorizer.build_analyzer()
+        self.vocabulary = vectorizer.vocabulary_
+        self.lowercase = vectorizer.lowercase
+        self.tokenize = None
+
+        # For plain unigram word analysis, stop words can never be vocabulary keys,
+        # so tokens can be looked up directly without the analyzer's filter pass
+        stop_words = vectorizer.get_stop_words() or ()
+        if (
+            vectorizer.analyzer == "word"
+            and vectorizer.ngram_range == (1, 1)
+            and vectorizer.strip_accents is None
+            and vectorizer.preprocessor is None
+            and not any(word in self.vocabulary for word in stop_words)
+        ):
+            self.tokenize = vectorizer.build_tokenizer()
+
+        # Word-character tokens never span the space joining document parts, so
+        # parts can be tokenized separately instead of being concatenated first
+        self.split_parts = self.tokenize is not None and vectorizer.token_pattern in (
+            DEFAULT_TOKEN_PATTERN,
+            FAST_TOKEN_PATTERN,
+        )
+        self.norm = vectorizer.norm
+        self.binary = vectorizer.binary
+        self.sublinear_tf = vectorizer.sublinear_tf
+
+        if vectorizer.use_idf:
+            self.idf = vectorizer.idf_
+        else:
+            self.idf = np.ones(len(self.vocabulary))
+
+        # Shape [n_coef_rows, n_features]
+        self.coef, intercept = linear_weights(classifier)
+        # Saved intercepts are float32; score in float64 like the sklearn path
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.classes = classifier.classes_
+        self.norm_code = NORM_CODES[self.norm]
+
+        # Plain ndarray views of the (possibly memory-mapped) arrays for the kernel
+        self.kernel = score_kernel
+        self.kernel_args = (np.asarray(self.idf), np.asarray(self.coef))
+
+    @staticmethod
+    def supports(vectorizer: Any, classifier: Any) -> bool:
+        """Check if the vectorizer/classifier pair can be fused."""
+        return (
+            isinstance(vectorizer, TfidfVectorizer)
+            and is_linear_classifier(classifier)
+            and hasattr(vectorizer, "vocabulary_")
+            and vectorizer.norm in (None, "l1", "l2")
+        )
+
+    def feature_counts(self, document: Document) -> Counter:
+        """Count in-vocabulary feature ids for a single document."""
+        lookup = self.vocabulary.get
+        if isinstance(document, str):
+            document = (document,)
+
+        if self.split_parts:
+            tokens = chain.from_iterable(
+                self.tokenize(part.lower() if self.lowercase else part)
+                for part in document
+            )
+        elif self.tokenize is not None:
+            text = " ".join(document)
+            tokens = self.tokenize(text.lower() if self.lowercase else text)
+        else:
+            tokens = self.analyzer(" ".join(document))
+        return Counter([i for i in map(lookup, tokens) if i is not None])
+
+    def decision_function(self, document: Document) -> np.ndarray:
+        """Compute the linear decision values for a single document."""
+        counts = self.feature_counts(document)
+        if not counts:
+            return self.intercept.copy()
+
+        n = len(counts)
+        feature_ids = np.fromiter(counts.keys(), dtype=np.intp, count=n)
+        tf = np.fromiter(counts.values(), dtype=np.float64, count=n)
+        if self.binary:
+            tf[:] = 1.0
+        elif self.sublinear_tf:
+            tf = np.log(tf) + 1.0
+
+        if self.kernel is not None:
+            idf, coef = self.kernel_args
+            return self.kernel(
+                feature_ids, tf, idf, coef, self.intercept, self.norm_code
+            )
+
+        tfidf = tf * self.idf[feature_ids]
+        if self.norm == "l2":
+            tfidf /= np.sqrt(np.dot(tfidf, tfidf))
+        elif self.norm == "l1":
+            tfidf /= np.abs(tfidf).sum()
+
+        return self.coef[:, feature_ids] @ tfidf + self.intercept
+
+    def predict(self, document: Document) -> Tuple[Any, np.ndarray]:
+        """
+        Score a single document.
+
+        Returns:
+            Tuple of (predicted class label, class probabilities)
+        """
+        decision = self.decision_function(document)
+
+        if decision.shape[0] == 1:
+            spam_prob = expit(decision[0])
+            probabilities = np.array([1.0 - spam_prob, spam_prob])
+            prediction = self.classes[int(decision[0] > 0)]
+        else:
+            probabilities = softmax(decision)
+            prediction = self.classes[int(np.argmax(decision))]
+
+        return prediction, probabilities
+
+    def predict_batch(self, documents: List[Document]) -> List[Tuple[Any, np.ndarray]]:
+        """Score a list of documents, returning a (prediction, probabilities) per document."""
+        return [self.predict(document) for document in documents]
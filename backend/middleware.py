@@ -5,48 +5,140 @@ Performance, security, and monitoring middleware.
 
 import time
 import logging
-from typing import Callable
+from typing import Callable, Optional, Tuple
 from fastapi import Request, Response
+from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.middleware.gzip import GZipMiddleware
-from collections import defaultdict
-from datetime import datetime, timedelta
+from starlette.exceptions import HTTPException
+from collections import defaultdict, deque
+
+try:
+    from redis.asyncio import Redis
+except ImportError:  # redis is optional; limits then stay per process
+    Redis = None
 
 logger = logging.getLogger("Phishing-Email-Detection-System-API.Middleware")
 
 
+class RequestSizeLimitMiddleware:
+    """
+    Reject requests whose body exceeds max_body_size with a 413.
+    Plain ASGI so a too-large Content-Length is refused before the multipart body
+    is read and spooled; bodies without one (chunked uploads) are counted as they
+    are received and cut off once they pass the limit.
+    """
+    
+    def __init__(self, app, max_body_size: int):
+        self.app = app
+        self.max_body_size = max_body_size
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit() and int(value) > self.max_body_size:
+                    response = JSONResponse(
+                        {"detail": "Request body too large."},
+                        status_code=413,
+                    )
+                    await response(scope, receive, send)
+                    return
+                break
+        
+        received = 0
+        
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    # Raised inside the body read; FastAPI re-raises HTTPExceptions
+                    # from body parsing, so the client gets the same 413
+                    raise HTTPException(status_code=413, detail="Request body too large.")
+            return message
+        
+        await self.app(scope, limited_receive, send)
+
+
 class RequestLoggingMiddleware(BaseHTTPMiddleware):
     """Log request details and performance metrics"""
     
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         # Process request
         response = await call_next(request)
         
         # Calculate duration
-        duration = time.time() - start_time
+        duration = time.perf_counter() - start_time
         
         # Log request details
         logger.info(
-            f"{request.method} {request.url.path} "
-            f"- Status: {response.status_code} "
-            f"- Duration: {duration:.3f}s"
+            "%s %s - Status: %s - Duration: %.3fs",
+            request.method,
+            request.url.path,
+            response.status_code,
+            duration,
         )
         
         # Add performance headers
-        response.headers["X-Process-Time"] = f"{duration:.3f}"
+        response.raw_headers.append((b"x-process-time", b"%.3f" % duration))
         
         return response
 
 
 class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Simple in-memory rate limiting"""
+    """
+    Per-IP rate limiting.
+    With a Redis URL the limit is a fixed window shared by every worker;
+    otherwise it is an in-memory sliding window per process.
+    """
     
-    def __init__(self, app, requests_per_minute: int = 60):
+    REDIS_PREFIX = "rl:"
+    
+    def __init__(
+        self,
+        app,
+        requests_per_minute: int = 60,
+        window_seconds: float = 60.0,
+        redis_url: Optional[str] = None,
+    ):
         super().__init__(app)
         self.requests_per_minute = requests_per_minute
-        self.requests: defaultdict = defaultdict(list)
+        self.window_seconds = window_seconds
+        # Per-IP request times (monotonic seconds), oldest first
+        self.requests: defaultdict = defaultdict(deque)
+        self._last_sweep = time.monotonic()
+        
+        self.redis = None
+        if redis_url:
+            if Redis is None:
+                logger.warning("REDIS_URL is set but redis is not installed; rate limits stay per process.")
+            else:
+                # Connections are opened lazily on the first command
+                self.redis = Redis.from_url(redis_url)
+    
+    async def _redis_count(self, client_ip: str) -> Tuple[int, int]:
+        """Count this request in the shared window; returns (count, seconds left)"""
+        window = max(1, int(self.window_seconds))
+        now = time.time()
+        bucket = int(now // window)
+        key = f"{self.REDIS_PREFIX}{client_ip}:{bucket}"
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.incr(key)
+            pipe.expire(key, window, nx=True)
+            count, _ = await pipe.execute()
+        return count, max(1, (bucket + 1) * window - int(now))
+    
+    def _evict_idle(self, cutoff: float) -> None:
+        """Drop clients whose newest request has left the window"""
+        idle = [ip for ip, times in self.requests.items() if not times or times[-1] < cutoff]
+        for ip in idle:
+            del self.requests[ip]
     
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         # Skip rate limiting for health checks
@@ -55,17 +147,36 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         
         # Get client IP
         client_ip = request.client.host
-        current_time = datetime.utcnow()
         
-        # Clean old requests
-        cutoff_time = current_time - timedelta(minutes=1)
-        self.requests[client_ip] = [
-            req_time for req_time in self.requests[client_ip]
-            if req_time > cutoff_time
-        ]
+        if self.redis is not None:
+            try:
+                count, retry_after = await self._redis_count(client_ip)
+            except Exception as e:
+                logger.warning("Redis rate limit check failed, using local limit: %s", e)
+            else:
+                if count > self.requests_per_minute:
+                    return Response(
+                        content="Rate limit exceeded. Please try again later.",
+                        status_code=429,
+                        headers={"Retry-After": str(retry_after)}
+                    )
+                return await call_next(request)
+        
+        current_time = time.monotonic()
+        cutoff_time = current_time - self.window_seconds
+        
+        # Forget idle clients once per window so the table doesn't grow with every IP seen
+        if current_time - self._last_sweep >= self.window_seconds:
+            self._evict_idle(cutoff_time)
+            self._last_sweep = current_time
+        
+        # Clean old requests; only expired entries at the front are touched
+        times = self.requests[client_ip]
+        while times and times[0] <= cutoff_time:
+            times.popleft()
         
         # Check rate limit
-        if len(self.requests[client_ip]) >= self.requests_per_minute:
+        if len(times) >= self.requests_per_minute:
             return Response(
                 content="Rate limit exceeded. Please try again later.",
                 status_code=429,
@@ -73,7 +184,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             )
         
         # Add current request
-        self.requests[client_ip].append(current_time)
+        times.append(current_time)
         
         return await call_next(request)
 
@@ -81,37 +192,46 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
 class SecurityHeadersMiddleware(BaseHTTPMiddleware):
     """Add security headers to responses"""
     
+    # Pre-encoded once; appended to the raw header list of every response
+    SECURITY_HEADERS = (
+        (b"x-content-type-options", b"nosniff"),
+        (b"x-frame-options", b"DENY"),
+        (b"x-xss-protection", b"1; mode=block"),
+        (b"strict-transport-security", b"max-age=31536000; includeSubDomains"),
+    )
+    
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         response = await call_next(request)
         
         # Add security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+        response.raw_headers.extend(self.SECURITY_HEADERS)
         
         return response
 
 
 def setup_middleware(app):
-    """Configure all middleware"""
+    """
+    Configure the opt-in security headers, rate limiting and request logging.
+    Each layer is only added when its setting is enabled. Compression and the
+    request size limit are added by app.py itself.
+    """
     from config import settings
     
-    # GZip compression
-    if settings.ENABLE_GZIP:
-        app.add_middleware(GZipMiddleware, minimum_size=1000)
-    
     # Security headers
-    app.add_middleware(SecurityHeadersMiddleware)
+    if settings.SECURITY_HEADERS_ENABLED:
+        app.add_middleware(SecurityHeadersMiddleware)
     
     # Rate limiting
     if settings.RATE_LIMIT_ENABLED:
         app.add_middleware(
             RateLimitMiddleware,
-            requests_per_minute=settings.RATE_LIMIT_REQUESTS
+            requests_per_minute=settings.RATE_LIMIT_REQUESTS,
+            window_seconds=settings.RATE_LIMIT_WINDOW,
+            redis_url=settings.REDIS_URL
         )
     
     # Request logging (add last, executes first)
-    app.add_middleware(RequestLoggingMiddleware)
+    if settings.REQUEST_LOGGING_ENABLED:
+        app.add_middleware(RequestLoggingMiddleware)
     
     logger.info("Middleware configured successfully")
@@ -0,0 +1,67 @@
+"""
+Inference Tests
+Check the fused scorer against the scikit-learn vectorize + predict_proba path.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from inference import (  # noqa: E402
+    FusedLinearScorer,
+    load_classifier_arrays,
+    load_vectorizer_arrays,
+    prepare_for_inference,
+)
+
+MODELS_DIR = os.path.join(BACKEND_DIR, "models")
+
+DOCUMENTS = [
+    (
+        "Congratulations!",
+        "You have won a free iPhone. Click here to claim your prize now!",
+    ),
+    ("Meeting tomorrow", "Hi team, the project review is moved to 3pm. Thanks, Sarah"),
+    "URGENT: verify your account password at http://example.com/login",
+    # No in-vocabulary tokens: the decision is the intercept alone
+    ("zz", "qq"),
+    "",
+]
+
+
+@pytest.fixture(scope="module")
+def models():
+    classifier_dir = os.path.join(MODELS_DIR, "classifier")
+    vectorizer_dir = os.path.join(MODELS_DIR, "vectorizer")
+    if not (os.path.isdir(classifier_dir) and os.path.isdir(vectorizer_dir)):
+        pytest.skip("model arrays not found")
+
+    classifier = load_classifier_arrays(classifier_dir)
+    vectorizer = load_vectorizer_arrays(vectorizer_dir)
+    prepare_for_inference(classifier, vectorizer)
+    return classifier, vectorizer
+
+
+def joined(document):
+    return document if isinstance(document, str) else " ".join(document)
+
+
+def test_fused_scorer_matches_sklearn(models):
+    classifier, vectorizer = models
+    scorer = FusedLinearScorer(vectorizer, classifier)
+
+    expected = classifier.predict_proba(
+        vectorizer.transform([joined(document) for document in DOCUMENTS])
+    )
+    results = scorer.predict_batch(DOCUMENTS)
+
+    assert not scorer.feature_counts(DOCUMENTS[3])
+    for (prediction, probabilities), row in zip(results, expected):
+        assert probabilities.dtype == np.float64
+        np.testing.assert_allclose(probabilities, row, rtol=1e-5, atol=1e-6)
+        assert prediction == classifier.classes_[int(np.argmax(row))]
@@ -0,0 +1,73 @@
+"""
+Middleware Tests
+Exercise the middleware stack installed on the API app.
+"""
+
+import os
+import sys
+import time
+
+# The middleware is opt-in; enable it with a small limit the test can exhaust.
+# Set before config is imported
+os.environ["RATE_LIMIT_ENABLED"] = "true"
+os.environ["SECURITY_HEADERS_ENABLED"] = "true"
+os.environ["REQUEST_LOGGING_ENABLED"] = "true"
+os.environ["RATE_LIMIT_REQUESTS"] = "3"
+os.environ.setdefault("PREDICTION_CACHE_PERSIST", "false")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import app as app_module  # noqa: E402
+
+# No lifespan: the database stays disconnected, so /reports answers 503 quickly
+client = TestClient(app_module.app)
+
+
+def test_rate_limit_returns_429():
+    statuses = [client.get("/reports").status_code for _ in range(4)]
+    assert statuses[:3] == [503, 503, 503]
+    assert statuses[3] == 429
+    assert client.get("/reports").headers["retry-after"]
+
+
+def test_rate_limit_window_slides_and_forgets_idle_clients():
+    from fastapi import FastAPI
+
+    from middleware import RateLimitMiddleware
+
+    small_app = FastAPI()
+
+    @small_app.get("/ping")
+    def ping():
+        return {}
+
+    small_app.add_middleware(
+        RateLimitMiddleware, requests_per_minute=2, window_seconds=0.2
+    )
+    small_client = TestClient(small_app)
+
+    assert [small_client.get("/ping").status_code for _ in range(3)] == [200, 200, 429]
+
+    limiter = small_app.middleware_stack
+    while not isinstance(limiter, RateLimitMiddleware):
+        limiter = limiter.app
+    limiter.requests["203.0.113.9"].append(time.monotonic())
+
+    time.sleep(0.25)
+    # Expired timestamps leave the window, and the idle client is evicted
+    assert small_client.get("/ping").status_code == 200
+    assert "203.0.113.9" not in limiter.requests
+
+
+def test_security_headers_are_added():
+    headers = client.get("/health").headers
+    assert headers["x-content-type-options"] == "nosniff"
+    assert headers["x-frame-options"] == "DENY"
+    assert headers["x-xss-protection"] == "1; mode=block"
+    assert headers["strict-transport-security"].startswith("max-age=")
+
+
+def test_process_time_header_is_added():
+    process_time = client.get("/health").headers["x-process-time"]
+    assert float(process_time) >= 0
@@ -24,7 +24,8 @@ export default function ReportsClient({
       setLoading(true) //Reset loading state on page change
       try {
         const apiUrl = getApiUrl()
-        const res = await fetch(`${apiUrl}/reports`)
+        const offset = (currentPage - 1) * pageSize
+        const res = await fetch(`${apiUrl}/reports?limit=${pageSize}&offset=${offset}`)
         // const res = await fetch(`http://peds.liger-saiph.ts.net:5000/reports`)
         if (!res.ok) throw new Error("Failed to fetch reports")
 
@@ -55,7 +56,7 @@ export default function ReportsClient({
   
   const startIndex = (currentPage - 1) * pageSize
   const endIndex = startIndex + pageSize
-  const reports = data.reports.slice(startIndex, endIndex)
+  const reports = data.reports
 
   const displayStart = startIndex + 1
   const displayEnd = Math.min(endIndex, data.total)
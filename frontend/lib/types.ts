@@ -9,7 +9,7 @@ export interface AttachmentInfo {
 export interface Report {
   _id: string
   subject: string
-  body: string
+  body?: string // omitted from paginated /reports listings
   prediction: "spam" | "ham"
   confidence: number
   spam_probability: number